@@ -9,8 +9,32 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+
+class CatalogASGIHandler(ASGIHandler):
+    # Маршруты с асинхронным чтением каталога, см. backend/asgi_urls.py
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = 'backend.asgi_urls'
+        return request, error_response
+
+
+# То же, что get_asgi_application(), но со своим обработчиком
+django.setup(set_prefix=False)
+django_application = CatalogASGIHandler()
+
+# Импорт после настройки Django
+from user_api.streams import STREAM_PATH, product_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Долгие SSE-соединения обслуживаются без обработчика Django
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        await product_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
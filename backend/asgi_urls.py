@@ -0,0 +1,13 @@
+from django.urls import path
+
+from user_api import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+# Под ASGI чтение каталога обслуживают асинхронные представления,
+# остальные маршруты совпадают с backend/urls.py
+urlpatterns = [
+	path('products/', async_views.product_list, name='product-list'),
+	path('products/<int:pk>/', async_views.product_detail, name='product'),
+	path('categories/', async_views.category_list, name='category-list'),
+] + sync_urlpatterns
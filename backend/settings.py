@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,6 +27,17 @@ CORS_ALLOW_CREDENTIALS = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Процессы, в которых создаются уменьшенные копии изображений
+IMAGE_DERIVATIVE_WORKERS = 2
+
+# Загрузка фотографий частями: куда складывать недокачанные файлы,
+# максимальный размер одной части и всего файла
+PHOTO_UPLOAD_TEMP_DIR = os.path.join(tempfile.gettempdir(), 'photo_uploads')
+PHOTO_UPLOAD_CHUNK_SIZE = 1024 * 1024
+PHOTO_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+# Незавершённые загрузки старше этого (секунды) удаляет cleanup_photo_uploads
+PHOTO_UPLOAD_EXPIRY = 24 * 60 * 60
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -73,6 +85,31 @@ TEMPLATES = [
 WSGI_APPLICATION = 'backend.wsgi.application'
 
 
+# Cache
+# Снимки каталога живут в памяти процесса и точно сбрасываются сигналами
+# этого процесса; TIMEOUT ограничивает устаревание в соседних воркерах
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'snapshots': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'snapshots',
+        'TIMEOUT': 60,
+    },
+    # Какие уменьшенные копии изображений уже созданы: ссылки без проверки файлов
+    # на каждый ответ. Общий для процессов бэкенд (Redis, Memcached) позволяет
+    # сбрасывать запись сразу после создания копий в любом процессе
+    'image_derivatives': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'image_derivatives',
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
@@ -80,6 +117,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Тестовая БД в файле: в памяти (shared cache) параллельные транзакции
+        # сразу получают «table is locked», а не ждут блокировку, как в работе
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -91,11 +131,54 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user_api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'user_api.throttling.CatalogThrottle',
+        'user_api.throttling.WriteThrottle',
+    ],
+    # Корзины токенов: ёмкость и пополнение за период, отдельно на каждый класс запросов
+    'DEFAULT_THROTTLE_RATES': {
+        'auth': '10/min',
+        'catalog': '300/min',
+        'writes': '60/min',
+    },
 }
 
+# Общее для всех процессов хранилище корзин токенов (файл, отображённый в память)
+THROTTLE_STORE_PATH = os.path.join(tempfile.gettempdir(), 'backend-throttle.bin')
+THROTTLE_STORE_SLOTS = 65536
+
+# Флеш-распродажи: сколько единиц товара процесс забирает из БД за раз
+# и сколько секунд считать распроданный товар распроданным без проверки БД
+FLASH_SALE_BATCH_SIZE = 50
+FLASH_SALE_SOLD_OUT_TTL = 5
+# Партия не больше этой доли оставшегося остатка: другим процессам тоже хватит.
+# После FLASH_SALE_LEASE_IDLE секунд без продаж процесс возвращает аренду сам;
+# аренду упавшего процесса возвращают другие через FLASH_SALE_LEASE_TTL секунд
+FLASH_SALE_LEASE_SHARE = 0.1
+FLASH_SALE_LEASE_IDLE = 2
+FLASH_SALE_LEASE_TTL = 30
+
+# Рассылка изменений остатков и цен по SSE. Брокер в памяти обслуживает
+# один процесс; для нескольких процессов подставляется общий брокер
+REALTIME_BROKER = 'user_api.broker.InProcessBroker'
+REALTIME_BROKER_OPTIONS = {'queue_size': 100}
+REALTIME_HEARTBEAT = 15
+
+# Фасеты каталога: границы интервалов цены со скидкой и скидки (%),
+# время жизни посчитанных счётчиков для одного набора фильтров
+FACET_PRICE_EDGES = [100, 250, 500, 1000, 2500]
+FACET_DISCOUNT_EDGES = [1, 10, 25, 50]
+FACETS_CACHE_TTL = 300
+
+# Импорт и экспорт товаров: строк в одной транзакции bulk_create,
+# сколько ошибок по строкам возвращать, строк на одно чтение экспорта
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_ERRORS = 1000
+EXPORT_CHUNK_SIZE = 2000
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -108,8 +191,34 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    # Пользователь собирается из утверждений токена, без запроса к БД
+    'TOKEN_USER_CLASS': 'user_api.authentication.ClaimsUser',
+    'TOKEN_OBTAIN_SERIALIZER': 'user_api.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'user_api.serializers.ClaimsTokenRefreshSerializer',
 }
 
+# Сколько секунд запись пользователя живёт в кэше процесса
+USER_CACHE_TTL = 30
+
+# Как часто процесс дочитывает отозванные в других процессах refresh-токены
+# Истёкшие токены удаляет manage.py flushexpiredtokens (по расписанию, см. README)
+REVOKED_TOKENS_SYNC_INTERVAL = 5
+
+
+# Хеширование паролей в ограниченном пуле: сколько хешей считается
+# одновременно, сколько ждёт в очереди и через сколько секунд повторить при 503
+PASSWORD_HASHERS = [
+    'user_api.hashing.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+# Хешированию отдаётся не больше половины ядер, остальное — каталогу
+PASSWORD_HASHING_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+PASSWORD_HASHING_MAX_QUEUE = 2 * PASSWORD_HASHING_WORKERS
+PASSWORD_HASHING_RETRY_AFTER = 1
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
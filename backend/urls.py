@@ -2,17 +2,32 @@ from django.urls import path
 from user_api import views
 from django.contrib import admin
 from rest_framework_simplejwt.views import TokenRefreshView
+from user_api.throttling import AuthThrottle
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/refresh/', TokenRefreshView.as_view(throttle_classes=[AuthThrottle]), name='token_refresh'),
 	path('register/', views.UserRegister.as_view(), name='register'),
 	path('login/', views.UserLogin.as_view(), name='login'),
 	path('logout/', views.UserLogout.as_view(), name='logout'),
 	path('profile/', views.UserView.as_view(), name='profile'),
+	path('metrics/password-hashing/', views.PasswordHashingMetricsView.as_view(), name='password-hashing-metrics'),
 	path('products/', views.ProductListCreateAPIView.as_view(), name='product-list'),
+	path('products/import/', views.ProductImportView.as_view(), name='product-import'),
+	path('products/export/', views.ProductExportView.as_view(), name='product-export'),
+	path('products/facets/', views.ProductFacetsAPIView.as_view(), name='product-facets'),
+	path('products/search/', views.ProductSearchAPIView.as_view(), name='product-search'),
+	path('products/autocomplete/', views.ProductAutocompleteAPIView.as_view(), name='product-autocomplete'),
+	path('products/changes/', views.ProductChangesAPIView.as_view(), name='product-changes'),
 	path('products/<int:pk>/', views.ProductDetailAPIView.as_view(), name='product'),
+	path('products/<int:pk>/photo-uploads/', views.PhotoUploadCreateView.as_view(), name='photo-upload-create'),
+	path('photo-uploads/<uuid:upload_id>/', views.PhotoUploadView.as_view(), name='photo-upload'),
 	path('categories/', views.CategoryList.as_view(), name='category-list'),
 	path('orders/', views.OrderListCreateAPIView.as_view(), name='order-list'),
+	path('seller/stats/', views.SellerStatsView.as_view(), name='seller-stats'),
 	path('cart/', views.CartView.as_view(), name='cart'),
+	path('cart/items/', views.CartItemsView.as_view(), name='cart-items'),
+	path('cart/items/<int:item_id>/', views.CartItemView.as_view(), name='cart-item'),
+	path('media/<path:path>', views.serve_media, name='media'),
+	path('cart/checkout/', views.CartCheckoutView.as_view(), name='cart-checkout'),
 ]	
@@ -1,9 +1,10 @@
 from django.contrib import admin
-from .models import AppUser, Category, Product, Order, Cart, CartItem
+from .models import AppUser, Category, Product, Order, Cart, CartItem, SellerDailySales
 
 admin.site.register(Category)
 admin.site.register(Product)
 admin.site.register(AppUser)
 admin.site.register(Order)
 admin.site.register(Cart)
-admin.site.register(CartItem)
\ No newline at end of file
+admin.site.register(CartItem)
+admin.site.register(SellerDailySales)
\ No newline at end of file
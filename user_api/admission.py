@@ -0,0 +1,196 @@
+import atexit
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from .models import FlashSaleLease, Product, products_updated
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLost(Exception):
+    # Аренду процесса уже вернули в товар: истекла или распродажу сняли
+    pass
+
+
+class FlashSaleGate:
+    """Продажа горячих товаров из счётчика в памяти процесса.
+
+    Остаток забирается из Product.quantity партиями (одна запись в товар на партию),
+    а заказы сверх арендованного остатка отклоняются без обращения к БД.
+    Непроданная часть партии записана в строке FlashSaleLease процесса: её
+    возвращает сам процесс после простоя или снятия распродажи, а после его
+    падения — любой другой процесс, когда аренда истечёт.
+    """
+
+    def __init__(self, batch_size, sold_out_ttl, share, idle, ttl):
+        self.batch_size = batch_size
+        self.sold_out_ttl = sold_out_ttl
+        self.share = share
+        self.idle = idle
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._leases = {}
+        self._used = {}
+        self._sold_out = {}
+        self._pid = None
+        self._owner = None
+        self._sweeper = None
+
+    @property
+    def owner(self):
+        # После fork у процесса своя аренда и свой фоновый поток
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._owner = f'{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}'
+            self._leases, self._used, self._sweeper = {}, {}, None
+        return self._owner
+
+    def is_sold_out(self, product_id):
+        deadline = self._sold_out.get(product_id)
+        return deadline is not None and deadline > time.monotonic()
+
+    def acquire(self, product, quantity):
+        """Резервирует quantity в памяти; продажу подтверждает confirm() вместе с заказом."""
+        product_id = product.pk
+        with self._lock:
+            owner = self.owner
+            if self.is_sold_out(product_id):
+                return False
+            left = self._leases.get(product_id, 0)
+            if left < quantity:
+                left += self._lease(product, quantity - left, owner)
+            if left < quantity:
+                self._leases[product_id] = left
+                self._sold_out[product_id] = time.monotonic() + self.sold_out_ttl
+                return False
+            self._leases[product_id] = left - quantity
+            self._used[product_id] = time.monotonic()
+            return True
+
+    def confirm(self, product_id, quantity):
+        # Вызывается в транзакции заказа: строка аренды и заказ меняются вместе
+        updated = FlashSaleLease.objects.filter(
+            product_id=product_id, owner=self.owner, quantity__gte=quantity,
+        ).update(quantity=F('quantity') - quantity, expires_at=self._expires_at())
+        if not updated:
+            with self._lock:
+                self._leases.pop(product_id, None)
+            raise LeaseLost(product_id)
+
+    def give_back(self, product_id, quantity):
+        # Заказ не записан: резерв возвращается в счётчик процесса
+        with self._lock:
+            if product_id in self._leases:
+                self._leases[product_id] += quantity
+            self._sold_out.pop(product_id, None)
+
+    def reset(self, product_id):
+        # Товар пополнили или изменили: снова пробуем арендовать остаток
+        with self._lock:
+            self._sold_out.pop(product_id, None)
+
+    def release(self, product_id):
+        # Возвращаем непроданный остаток товара в БД
+        with self._lock:
+            self._sold_out.pop(product_id, None)
+            if self._leases.pop(product_id, None) is None:
+                return
+            self._used.pop(product_id, None)
+            self._return(FlashSaleLease.objects.filter(product_id=product_id, owner=self.owner))
+
+    def release_all(self):
+        with self._lock:
+            if self._leases:
+                self._return(FlashSaleLease.objects.filter(owner=self.owner))
+            self._leases.clear()
+            self._used.clear()
+
+    def sweep(self):
+        """Возвращает простаивающие и снятые с распродажи аренды процесса и истёкшие чужие."""
+        with self._lock:
+            idle_since = time.monotonic() - self.idle
+            stale = {product_id for product_id, used in self._used.items() if used < idle_since}
+            stale |= set(
+                Product.objects.filter(pk__in=self._leases, is_flash_sale=False).values_list('pk', flat=True)
+            )
+            for product_id in stale:
+                self.release(product_id)
+        self._return(FlashSaleLease.objects.filter(expires_at__lt=timezone.now()))
+
+    def _expires_at(self):
+        return timezone.now() + timedelta(seconds=self.ttl)
+
+    def _lease(self, product, wanted, owner):
+        products = Product.objects.filter(pk=product.pk)
+        for _ in range(3):
+            available = products.values_list('quantity', flat=True).first()
+            if not available or available < wanted:
+                return 0
+            # Не больше партии и доли остатка, но не меньше, чем нужно заказу
+            taken = min(available, max(wanted, min(self.batch_size, math.ceil(available * self.share))))
+            with transaction.atomic():
+                # Условие на прежний остаток: параллельно товар мог забрать другой процесс
+                if not products.filter(quantity=available).update(quantity=available - taken, updated_at=Now()):
+                    continue
+                lease = FlashSaleLease.objects.filter(product_id=product.pk, owner=owner)
+                if not lease.update(quantity=F('quantity') + taken, expires_at=self._expires_at()):
+                    FlashSaleLease.objects.create(
+                        product_id=product.pk, owner=owner, quantity=taken, expires_at=self._expires_at(),
+                    )
+                # В той же транзакции: если обработчики сигнала упадут, аренда
+                # откатится, а не останется в БД мимо счётчика процесса
+                products_updated.send(sender=Product, product_ids=[product.pk], category_ids=[product.category_id])
+            self._used[product.pk] = time.monotonic()
+            self._start_sweeper()
+            return taken
+        return 0
+
+    def _return(self, leases):
+        returned = {}
+        with transaction.atomic():
+            rows = leases.values_list('pk', 'product_id', 'quantity', 'product__category_id')
+            for pk, product_id, quantity, category_id in rows:
+                # Удаляем, только если с чтения не было продаж: иначе вернём в следующий раз
+                if FlashSaleLease.objects.filter(pk=pk, quantity=quantity).delete()[0] and quantity:
+                    Product.objects.filter(pk=product_id).update(quantity=F('quantity') + quantity, updated_at=Now())
+                    returned[product_id] = category_id
+            if returned:
+                products_updated.send(sender=Product, product_ids=list(returned), category_ids=set(returned.values()))
+
+    def _start_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_forever, daemon=True)
+            self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.idle / 2)
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception('Не удалось вернуть аренду флеш-распродажи')
+            finally:
+                # У потока своё соединение с БД
+                connection.close()
+
+
+gate = FlashSaleGate(
+    batch_size=settings.FLASH_SALE_BATCH_SIZE,
+    sold_out_ttl=settings.FLASH_SALE_SOLD_OUT_TTL,
+    share=settings.FLASH_SALE_LEASE_SHARE,
+    idle=settings.FLASH_SALE_LEASE_IDLE,
+    ttl=settings.FLASH_SALE_LEASE_TTL,
+)
+atexit.register(gate.release_all)
@@ -0,0 +1,125 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django_filters.utils import translate_validation
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+
+from . import snapshots, versions, views
+from .authentication import ClaimsJWTAuthentication
+from .filters import ProductFilter
+from .models import Product
+from .pagination import ProductCursorPagination
+from .serializers import ProductSerializer
+from .throttling import CatalogThrottle
+
+# Асинхронные версии чтения каталога для ASGI (см. backend/asgi_urls.py).
+# Запись и редкие сценарии отдаются синхронным представлениям DRF.
+_product_list = sync_to_async(views.ProductListCreateAPIView.as_view())
+# Для GET, уже списавшего токен в _throttled: второй раз корзину не трогаем
+_paged_product_list = sync_to_async(views.ProductListCreateAPIView.as_view(throttle_classes=[]))
+_product_detail = sync_to_async(views.ProductDetailAPIView.as_view())
+_category_list = sync_to_async(views.CategoryList.as_view())
+
+
+def _json(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def _authentication_error(request):
+    # Ответ 401 как у DRF или None. Пользователь собирается из токена
+    # без обращения к БД, поэтому проверка идёт прямо в event loop
+    authenticator = ClaimsJWTAuthentication()
+    try:
+        result = authenticator.authenticate(request)
+        if result is None or not result[0].is_active:
+            raise exceptions.NotAuthenticated()
+    except exceptions.APIException as error:
+        response = _json({'detail': error.detail}, status=401)
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+        return response
+    return None
+
+
+def _throttled(request):
+    # Ответ 429 как у DRF или None. Пользователь здесь ещё не известен,
+    # поэтому корзина берётся по IP
+    throttle = CatalogThrottle()
+    if throttle.allow(f'{throttle.scope}:ip:{throttle.get_ident(request)}'):
+        return None
+    error = exceptions.Throttled(throttle.wait())
+    response = _json({'detail': error.detail}, status=error.status_code)
+    response['Retry-After'] = '%d' % error.wait
+    return response
+
+
+@csrf_exempt
+async def product_list(request):
+    if request.method != 'GET':
+        return await _product_list(request)
+    throttled = _throttled(request)
+    if throttled is not None:
+        return throttled
+    category_id = request.GET.get('category', '')
+    if list(request.GET) == ['category'] and category_id.isdigit():
+        try:
+            snapshot = await snapshots.aget(
+                snapshots.category_products(int(category_id)),
+                lambda: views.ProductListCreateAPIView().build_snapshot(request),
+            )
+        except exceptions.ValidationError as e:
+            # Несуществующая категория: 400, как у синхронного представления
+            return _json(e.detail, status=400)
+        return snapshot.response(request)
+    paginator = ProductCursorPagination()
+    if paginator.cursor_query_param in request.GET or paginator.page_size_query_param in request.GET:
+        # Курсорная пагинация DRF синхронная
+        return await _paged_product_list(request)
+    version, changed_at = await versions.acurrent('product')
+    etag = f'"products-{version}"'
+    not_modified = versions.not_modified(request, etag, changed_at)
+    if not_modified is not None:
+        return not_modified
+    filterset = ProductFilter(request.GET, queryset=Product.objects.all())
+    # Проверка seller и category обращается к БД, остальные поля — нет
+    if 'seller' in request.GET or 'category' in request.GET:
+        is_valid = await sync_to_async(filterset.is_valid)()
+    else:
+        is_valid = filterset.is_valid()
+    if not is_valid:
+        return _json(translate_validation(filterset.errors).detail, status=400)
+    products = [product async for product in filterset.qs]
+    response = _json(ProductSerializer(products, many=True).data)
+    return versions.set_validators(response, etag, changed_at)
+
+
+@csrf_exempt
+async def product_detail(request, pk):
+    if request.method != 'GET':
+        return await _product_detail(request, pk=pk)
+    throttled = _throttled(request)
+    if throttled is not None:
+        return throttled
+    product = await Product.objects.filter(pk=pk).afirst()
+    if product is None:
+        return HttpResponse(status=404)
+    etag = f'"product-{pk}-{int(product.updated_at.timestamp() * 1000000)}"'
+    not_modified = versions.not_modified(request, etag, product.updated_at)
+    if not_modified is not None:
+        return not_modified
+    response = _json(ProductSerializer(product, context={'request': request}).data)
+    return versions.set_validators(response, etag, product.updated_at)
+
+
+@csrf_exempt
+async def category_list(request):
+    if request.method != 'GET':
+        return await _category_list(request)
+    throttled = _throttled(request)
+    if throttled is not None:
+        return throttled
+    error_response = _authentication_error(request)
+    if error_response is not None:
+        return error_response
+    snapshot = await snapshots.aget(snapshots.CATEGORIES, views.CategoryList().build_snapshot)
+    return snapshot.response(request)
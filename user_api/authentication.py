@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+
+from .models import AppUser
+
+# Поля пользователя, которые кладутся в токен и читаются без запроса к БД
+CLAIMS = ('is_active', 'is_staff')
+
+
+def add_claims(token, user):
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def _cache_key(user_id):
+    return f'user:{user_id}'
+
+
+def get_user(user_id):
+    """AppUser из кэша процесса; в БД идём раз в USER_CACHE_TTL секунд."""
+    cache = caches['default']
+    user = cache.get(_cache_key(user_id))
+    if user is None:
+        user = AppUser.objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(_cache_key(user_id), user, settings.USER_CACHE_TTL)
+    return user
+
+
+def forget_user(user_id):
+    caches['default'].delete(_cache_key(user_id))
+
+
+class ClaimsUser(TokenUser):
+    """Пользователь из утверждений токена.
+
+    Для фильтров по владельцу хватает pk; запись пользователя загружается
+    только при обращении к instance или к полю, которого нет в токене.
+    """
+
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', True)
+
+    @cached_property
+    def instance(self):
+        return get_user(self.pk)
+
+    def __getattr__(self, attr):
+        if attr in self.token:
+            return self.token[attr]
+        if attr.startswith('_') or self.instance is None:
+            raise AttributeError(attr)
+        return getattr(self.instance, attr)
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """JWT-аутентификация без запроса пользователя к БД на каждый запрос."""
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
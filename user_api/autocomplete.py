@@ -0,0 +1,234 @@
+import heapq
+import logging
+import threading
+from bisect import bisect_left, insort
+
+from django.db import connection, transaction
+
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+MAX_SUGGESTIONS = 20
+# Сколько префиксов держать в кэше готовых ответов
+CACHE_SIZE = 10000
+# С какого размера пачки новых товаров дешевле перечитать индекс целиком:
+# insort в список из сотен тысяч терминов стоит порядка миллисекунды
+REBUILD_THRESHOLD = 1000
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().replace('ё', 'е').split())
+
+
+def terms_for(name):
+    # Подсказка находится и по началу названия, и по началу любого слова в нём
+    words = normalize(name).split(' ')
+    return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+class PrefixIndex:
+    """Отсортированный в памяти список терминов для поиска по префиксу.
+
+    Для запрошенных префиксов кэшируется топ подсказок; при изменении товара
+    кэш правится точечно и пересчитывается, только если топ мог измениться.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._keys = []
+        self._entries = {}
+        self._cache = {}
+        # Правки, пришедшие во время перестройки, и запрос на ещё одну перестройку
+        self._changes = None
+        self._stale = False
+
+    def _load(self):
+        products = Product.objects.values_list('pk', 'name', 'quantity', 'discount')
+        for pk, name, quantity, discount in products.iterator():
+            self._put(('product', pk), name, (quantity > 0, discount), sort=False)
+        for pk, name in Category.objects.values_list('pk', 'name').iterator():
+            self._put(('category', pk), name, (True, 0), sort=False)
+        self._keys.sort()
+        self._built = True
+
+    def _order(self, key):
+        # Сначала товары в наличии, затем с большей скидкой
+        in_stock, discount = self._entries[key][1]
+        return (not in_stock, -discount, key[1], key[0])
+
+    def _put(self, key, name, score, sort=True):
+        terms = terms_for(name)
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] == terms:
+            # Изменились только остаток или скидка: список терминов не трогаем
+            old_terms = terms
+            self._entries[key] = (name, score, terms)
+        else:
+            old_terms = self._drop(key, touch_cache=False)
+            self._entries[key] = (name, score, terms)
+            for term in terms:
+                if sort:
+                    insort(self._keys, (term, key))
+                else:
+                    self._keys.append((term, key))
+        if self._cache:
+            new_prefixes = self._prefixes(terms)
+            for prefix in self._prefixes(old_terms) - new_prefixes:
+                self._uncache(prefix, key)
+            for prefix in new_prefixes:
+                self._recache(prefix, key)
+
+    def _drop(self, key, touch_cache=True):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return set()
+        for term in entry[2]:
+            i = bisect_left(self._keys, (term, key))
+            if i < len(self._keys) and self._keys[i] == (term, key):
+                del self._keys[i]
+        if touch_cache and self._cache:
+            for prefix in self._prefixes(entry[2]):
+                self._uncache(prefix, key)
+        return entry[2]
+
+    def _prefixes(self, terms):
+        return {term[:i] for term in terms for i in range(1, len(term) + 1)} & self._cache.keys()
+
+    def _uncache(self, prefix, key):
+        top = self._cache[prefix]
+        for i, (_, cached_key) in enumerate(top):
+            if cached_key == key:
+                if len(top) == MAX_SUGGESTIONS:
+                    # Неизвестно, кто займёт освободившееся место
+                    del self._cache[prefix]
+                else:
+                    del top[i]
+                return
+
+    def _recache(self, prefix, key):
+        top = self._cache[prefix]
+        full = len(top) == MAX_SUGGESTIONS
+        was_cached = any(cached_key == key for _, cached_key in top)
+        if was_cached:
+            top[:] = [item for item in top if item[1] != key]
+        order = self._order(key)
+        if full and was_cached and order > top[-1][0]:
+            del self._cache[prefix]
+            return
+        if not full or was_cached or order < top[-1][0]:
+            insort(top, (order, key))
+            del top[MAX_SUGGESTIONS:]
+
+    def _top(self, prefix):
+        lo = bisect_left(self._keys, (prefix,))
+        hi = bisect_left(self._keys, (prefix + '\uffff',))
+        matches = {key for _, key in self._keys[lo:hi]}
+        return heapq.nsmallest(MAX_SUGGESTIONS, ((self._order(key), key) for key in matches))
+
+    def update(self, kind, pk, name, score):
+        with self._lock:
+            if self._built:
+                self._put((kind, pk), name, score)
+                if self._changes is not None:
+                    self._changes[(kind, pk)] = (name, score)
+
+    def remove(self, kind, pk):
+        with self._lock:
+            if self._built:
+                self._drop((kind, pk))
+                if self._changes is not None:
+                    self._changes[(kind, pk)] = None
+
+    def rebuild(self):
+        """Перечитывает индекс из БД, не останавливая подсказки.
+
+        Новый индекс строится без блокировки, пока запросы обслуживает старый;
+        правки, пришедшие за это время, переносятся в новый перед подменой.
+        """
+        with self._lock:
+            if not self._built:
+                # Ещё не загружен: прочитается целиком при первом запросе
+                return
+            if self._changes is not None:
+                # Перестройка уже идёт: она перечитает БД ещё раз
+                self._stale = True
+                return
+            self._changes = {}
+        try:
+            while True:
+                fresh = PrefixIndex()
+                fresh._load()
+                with self._lock:
+                    if self._stale:
+                        self._stale = False
+                        continue
+                    for key, change in self._changes.items():
+                        if change is None:
+                            fresh._drop(key)
+                        else:
+                            fresh._put(key, *change)
+                    self._keys, self._entries, self._cache = fresh._keys, fresh._entries, {}
+                    return
+        finally:
+            with self._lock:
+                self._changes = None
+                self._stale = False
+
+    def suggest(self, prefix, limit=10):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            if not self._built:
+                self._load()
+            top = self._cache.get(prefix)
+            if top is None:
+                if len(self._cache) >= CACHE_SIZE:
+                    self._cache.clear()
+                top = self._cache[prefix] = self._top(prefix)
+            return [
+                {'type': kind, 'id': pk, 'name': self._entries[(kind, pk)][0]}
+                for _, (kind, pk) in top[:limit]
+            ]
+
+
+index = PrefixIndex()
+
+
+def update_product(product):
+    index.update('product', product.pk, product.name, (product.quantity > 0, product.discount))
+
+
+def update_products(product_ids):
+    """Точечно обновляет подсказки по товарам, изменённым в обход save()."""
+    if not index._built:
+        return
+    rows = Product.objects.filter(pk__in=product_ids).values_list('pk', 'name', 'quantity', 'discount')
+    for pk, name, quantity, discount in rows:
+        index.update('product', pk, name, (quantity > 0, discount))
+
+
+def _rebuild():
+    try:
+        index.rebuild()
+    except Exception:
+        logger.exception('Не удалось перестроить индекс подсказок')
+    finally:
+        # У потока своё соединение с БД
+        connection.close()
+
+
+def refresh_products(product_ids):
+    # После коммита: откат транзакции не должен попасть в подсказки.
+    # Большие пачки (импорт) перечитываются в фоновом потоке, а не в запросе
+    if len(product_ids) > REBUILD_THRESHOLD:
+        transaction.on_commit(lambda: threading.Thread(target=_rebuild, daemon=True).start())
+    else:
+        product_ids = list(product_ids)
+        transaction.on_commit(lambda: update_products(product_ids))
+
+
+def update_category(category):
+    index.update('category', category.pk, category.name, (True, 0))
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def product_topic(product_id):
+    return f'product:{product_id}'
+
+
+def category_topic(category_id):
+    return f'category:{category_id}'
+
+
+class Subscription:
+    """Очередь событий одного клиента, читается в его event loop."""
+
+    def __init__(self, topics, maxsize):
+        self.topics = frozenset(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def put(self, message):
+        # Медленный клиент теряет старые события, а не тормозит остальных:
+        # для остатков и цен важно только последнее состояние
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+
+class InProcessBroker:
+    """Рассылка событий подписчикам внутри одного процесса.
+
+    publish() вызывается из любого потока (обработчики сигналов работают
+    в потоках WSGI/sync_to_async), доставка идёт через call_soon_threadsafe
+    в event loop подписчика. Для нескольких процессов нужен общий брокер
+    с тем же интерфейсом, он подключается через REALTIME_BROKER.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._topics = defaultdict(set)
+
+    def subscribe(self, topics):
+        subscription = Subscription(topics, self.queue_size)
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def publish(self, topics, message):
+        with self._lock:
+            # Подписчик и товара, и его категории получает событие один раз
+            subscriptions = set().union(*[self._topics.get(topic, ()) for topic in topics])
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # event loop уже закрыт
+                self.unsubscribe(subscription)
+
+
+broker = import_string(settings.REALTIME_BROKER)(**settings.REALTIME_BROKER_OPTIONS)
+
+
+def publish_products(rows):
+    """Рассылает состояние товаров: словари с id, category, quantity, price, discount."""
+    for row in rows:
+        broker.publish([product_topic(row['id']), category_topic(row['category'])], row)
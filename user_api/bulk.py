@@ -0,0 +1,232 @@
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxLengthValidator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+
+from .models import Category, Product, products_created
+
+FORMATS = ('csv', 'ndjson')
+# Колонки импорта; остальные (id, seller, effective_price из экспорта) пропускаются
+IMPORT_FIELDS = (
+    'name', 'description', 'composition', 'discount', 'quantity', 'weight', 'price',
+    'manufacture_date', 'expiry_date', 'category', 'is_flash_sale',
+)
+EXPORT_FIELDS = ('id', *IMPORT_FIELDS, 'seller', 'effective_price')
+
+
+def format_for(name, default='csv'):
+    # По расширению файла или Content-Type: text/csv, application/x-ndjson
+    name = (name or '').lower()
+    if 'ndjson' in name or name.endswith(('.jsonl', 'jsonlines')):
+        return 'ndjson'
+    if 'csv' in name:
+        return 'csv'
+    return default
+
+
+def iter_records(stream, fmt):
+    """Построчно разбирает поток байтов, выдаёт (номер строки, запись, ошибка).
+
+    stream — любой итератор строк байтов: файл или сам HttpRequest.
+    """
+    text = codecs.iterdecode(stream, 'utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f'Некорректный JSON: {e}'
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'Ожидается объект JSON.'
+            continue
+        yield line_number, record, None
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, line, errors):
+        self.failed += 1
+        # Все ошибки считаем, но храним не больше IMPORT_MAX_ERRORS
+        if len(self.errors) < settings.IMPORT_MAX_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {'created': self.created, 'failed': self.failed, 'errors': self.errors}
+
+
+class _Column:
+    """Проверка поля импорта: то же, что Field.clean(), но собранное один раз на файл."""
+
+    def __init__(self, field):
+        self.name = field.name
+        self.attname = field.attname
+        self.has_default = field.has_default()
+        self.null = field.null
+        self.blank = field.blank and isinstance(field, (models.CharField, models.TextField))
+        self.blank_message = field.error_messages['blank']
+        if field.is_relation:
+            # Существование категории проверяется одним запросом на пачку в _insert
+            self.to_python, self.validators = field.target_field.to_python, []
+        else:
+            self.to_python, self.validators = field.to_python, list(field.validators)
+            if isinstance(field, models.TextField) and field.max_length:
+                # У TextField max_length не даёт валидатора: его проверяют форма
+                # и сериализатор API, а не Field.clean(). Описание до 800, состав до 400
+                self.validators.append(MaxLengthValidator(field.max_length))
+
+
+def _clean(record, columns):
+    values, errors = {}, {}
+    for column in columns:
+        value = record.get(column.name)
+        if value is None or value == '':
+            if column.has_default:
+                continue
+            if column.blank:
+                values[column.attname] = ''
+            elif column.null:
+                values[column.attname] = None
+            else:
+                errors[column.name] = ['Обязательное поле.']
+            continue
+        try:
+            value = column.to_python(value)
+            for validator in column.validators:
+                validator(value)
+        except ValidationError as e:
+            errors[column.name] = e.messages
+            continue
+        values[column.attname] = value
+    return values, errors
+
+
+def _create(rows, seller_id):
+    """Вставляет товары, возвращает их id."""
+    # Сам объект соединения, а не прокси django.db.connection: к нему
+    # обращаются для каждого значения
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor != 'sqlite':
+        return [product.pk for product in Product.objects.bulk_create([Product(seller_id=seller_id, **values) for values in rows])]
+    # bulk_create на SQLite 3.35+ тоже возвращает id, но дробит вставку по лимиту
+    # в 999 параметров (~50 строк на INSERT ... RETURNING) и готовит каждое значение
+    # через компилятор. benchmark_product_import --rows 50000, только эта функция:
+    # bulk_create 14–18 с, подготовленный INSERT через executemany 2.9 с
+    columns = [field for field in Product._meta.concrete_fields if not field.primary_key and not field.generated]
+    template = Product(seller_id=seller_id)
+    # Значения по умолчанию, auto_now и продавец одинаковы для всей пачки
+    defaults = {field.attname: field.get_db_prep_save(field.pre_save(template, True), connection) for field in columns}
+    # После проверки строки, числа и bool драйвер принимает как есть;
+    # Decimal и даты готовит поле
+    prepare = [
+        (field.attname, field.get_db_prep_save if isinstance(field, (models.DecimalField, models.DateField)) else None)
+        for field in columns
+    ]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(Product._meta.db_table),
+        ', '.join(connection.ops.quote_name(field.column) for field in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            tuple(
+                defaults[attname] if attname not in values
+                else prep(values[attname], connection) if prep else values[attname]
+                for attname, prep in prepare
+            )
+            for values in rows
+        ])
+        # AUTOINCREMENT: внутри одной пишущей транзакции id идут подряд
+        cursor.execute('SELECT last_insert_rowid()')
+        last_id = cursor.fetchone()[0]
+    return list(range(last_id - len(rows) + 1, last_id + 1))
+
+
+def _insert(batch, seller_id, report):
+    category_ids = {values['category_id'] for _, values in batch}
+    known = set(Category.objects.filter(pk__in=category_ids).values_list('pk', flat=True))
+    rows = []
+    for line, values in batch:
+        if values['category_id'] not in known:
+            report.fail(line, {'category': [f'Категория {values["category_id"]} не найдена.']})
+            continue
+        rows.append(values)
+    if not rows:
+        return
+    # Пачка — отдельная транзакция: ошибка в БД не откатывает уже загруженное
+    with transaction.atomic():
+        product_ids = _create(rows, seller_id)
+        products_created.send(
+            sender=Product,
+            product_ids=product_ids,
+            category_ids={values['category_id'] for values in rows},
+        )
+    report.created += len(rows)
+
+
+def import_products(stream, fmt, seller_id, batch_size=None):
+    """Потоковый импорт товаров продавца из CSV или NDJSON.
+
+    Строки проверяются полями модели (те же валидаторы, что и в API),
+    категории — одним запросом на пачку; корректные строки вставляются
+    пачками по IMPORT_BATCH_SIZE в своей транзакции, ошибки собираются по строкам.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    columns = [_Column(Product._meta.get_field(name)) for name in IMPORT_FIELDS]
+    report = ImportReport()
+    batch = []
+    line = 0
+    try:
+        for line, record, error in iter_records(stream, fmt):
+            if error:
+                report.fail(line, {'non_field_errors': [error]})
+                continue
+            values, errors = _clean(record, columns)
+            if errors:
+                report.fail(line, errors)
+                continue
+            batch.append((line, values))
+            if len(batch) >= batch_size:
+                _insert(batch, seller_id, report)
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Дальше файл не разобрать; загруженное до этого места остаётся
+        report.fail(line + 1, {'non_field_errors': [f'Файл не разобран: {e}']})
+    if batch:
+        _insert(batch, seller_id, report)
+    return report
+
+
+class _Echo:
+    # csv.writer пишет строку и сразу отдаёт её генератору
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, fmt):
+    """Генератор частей ответа; iterator() читает БД порциями, память не растёт."""
+    rows = queryset.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
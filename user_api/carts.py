@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Window
+
+from .models import Cart, CartItem, Product
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def get_cart(user_id):
+    # Корзина создаётся вместе с пользователем, get_or_create — на случай старых записей
+    cart, created = Cart.objects.get_or_create(user_id=user_id)
+    return cart
+
+
+class UnknownProducts(Exception):
+    def __init__(self, product_ids):
+        super().__init__('Товары не найдены')
+        self.product_ids = sorted(product_ids)
+
+
+def _fold(changes):
+    # Несколько изменений одного товара сводим к одному: ('set' | 'increment', количество)
+    result = {}
+    for change in changes:
+        product_id, op, quantity = change['product'], change['op'], change.get('quantity', 0)
+        if op == 'remove':
+            result[product_id] = ('set', 0)
+        elif op == 'set' or product_id not in result:
+            result[product_id] = (op, quantity)
+        else:
+            result[product_id] = (result[product_id][0], result[product_id][1] + quantity)
+    return result
+
+
+def apply_changes(cart, changes):
+    """Применяет пакет изменений корзины за постоянное число запросов.
+
+    changes — словари product, op ('set', 'increment', 'remove'), quantity.
+    Количество 0 удаляет строку.
+    """
+    folded = _fold(changes)
+    # Удалять можно и уже несуществующий товар, добавлять — нет
+    added = {product_id for product_id, (op, quantity) in folded.items() if op == 'increment' or quantity > 0}
+    known = set(Product.objects.filter(pk__in=added).values_list('pk', flat=True)) if added else set()
+    if len(known) < len(added):
+        raise UnknownProducts(added - known)
+    with transaction.atomic():
+        increments = [product_id for product_id, (op, quantity) in folded.items() if op == 'increment']
+        current = dict(
+            CartItem.objects.select_for_update()
+            .filter(cart=cart, product_id__in=increments)
+            .values_list('product_id', 'quantity')
+        ) if increments else {}
+        quantities = {
+            product_id: quantity + (current.get(product_id, 0) if op == 'increment' else 0)
+            for product_id, (op, quantity) in folded.items()
+        }
+        removed = [product_id for product_id, quantity in quantities.items() if quantity <= 0]
+        if removed:
+            CartItem.objects.filter(cart=cart, product_id__in=removed).delete()
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, product_id=product_id, quantity=quantity)
+             for product_id, quantity in quantities.items() if quantity > 0],
+            update_conflicts=True,
+            unique_fields=['cart', 'product'],
+            update_fields=['quantity'],
+        )
+    return cart
+
+
+def load_lines(cart):
+    """Позиции корзины с товарами и суммами одним запросом.
+
+    Цена со скидкой — хранимая Product.effective_price, та же, что в каталоге
+    и в заказе; сумма строки и итог корзины (оконная сумма по всем строкам)
+    считаются в SQL.
+    """
+    unit_price = F('product__effective_price')
+    line_total = ExpressionWrapper(unit_price * F('quantity'), output_field=MONEY)
+    lines = list(
+        CartItem.objects.filter(cart=cart)
+        .select_related('product')
+        .annotate(unit_price=unit_price, line_total=line_total, cart_total=Window(Sum(line_total)))
+        .order_by('id')
+    )
+    cart.lines = lines
+    cart.total = lines[0].cart_total if lines else 0
+    return cart
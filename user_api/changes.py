@@ -0,0 +1,35 @@
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ProductChange
+
+
+def record(product_ids, deleted=False):
+    """Записывает новое изменение товаров, прежние записи о них удаляются.
+
+    Так в журнале остаётся по одной строке на товар, а ответ ленты
+    пропорционален числу изменённых товаров, а не числу правок.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    connection = connections[DEFAULT_DB_ALIAS]
+    table = connection.ops.quote_name(ProductChange._meta.db_table)
+    changed_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic():
+        last_seq = ProductChange.objects.aggregate(last=Max('seq'))['last'] or 0
+        # Сначала вставка, потом удаление: иначе SQLite может выдать
+        # новой строке уже выданный seq удалённой. Один подготовленный
+        # INSERT вместо bulk_create: импорт пишет тысячи строк за раз
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (product_id, deleted, changed_at) VALUES (%s, %s, %s)',
+                [(product_id, deleted, changed_at) for product_id in product_ids],
+            )
+        ProductChange.objects.filter(product_id__in=product_ids, seq__lte=last_seq).delete()
+
+
+def since(seq, limit):
+    """Изменения после seq по возрастанию, не больше limit штук."""
+    return list(ProductChange.objects.filter(seq__gt=seq).order_by('seq')[:limit])
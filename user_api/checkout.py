@@ -0,0 +1,101 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, When
+from django.db.models.functions import Now
+
+from . import admission, stats
+from .models import CartItem, Order, Product, products_updated
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        super().__init__('Недостаточное количество товара на складе')
+        self.product_ids = sorted(product_ids)
+
+
+class EmptyCart(Exception):
+    pass
+
+
+def place_orders(buyer, lines):
+    """Списывает остатки и создаёт заказы для пар (товар, количество).
+
+    Вызывается внутри транзакции, товары должны быть уже заблокированы.
+    Число запросов не зависит от количества позиций.
+    """
+    products = {}
+    wanted = Counter()
+    for product, quantity in lines:
+        products[product.pk] = product
+        wanted[product.pk] += quantity
+    short = [pk for pk, quantity in wanted.items() if quantity > products[pk].quantity]
+    if short:
+        raise InsufficientStock(short)
+    try:
+        # CHECK (quantity >= 0) у PositiveIntegerField не даст уйти в минус
+        with transaction.atomic():
+            Product.objects.filter(pk__in=wanted).update(quantity=Case(
+                *[When(pk=pk, then=F('quantity') - quantity) for pk, quantity in wanted.items()],
+            ), updated_at=Now())
+    except IntegrityError:
+        raise InsufficientStock(wanted)
+    products_updated.send(
+        sender=Product,
+        product_ids=list(wanted),
+        category_ids={product.category_id for product in products.values()},
+    )
+    for pk, quantity in wanted.items():
+        products[pk].quantity -= quantity
+    orders = Order.objects.bulk_create([
+        Order(
+            buyer_id=buyer.pk, seller_id=product.seller_id, product=product,
+            quantity=quantity, unit_price=product.effective_price,
+        )
+        for product, quantity in lines
+    ])
+    # bulk_create не шлёт post_save, итоги продавцов обновляем сами
+    stats.record_orders(orders)
+    return orders
+
+
+def create_order(buyer, product, quantity):
+    if product.is_flash_sale:
+        # Горячий товар продаётся из арендованного остатка, без записи в Product
+        if not admission.gate.acquire(product, quantity):
+            raise InsufficientStock([product.pk])
+        try:
+            with transaction.atomic():
+                admission.gate.confirm(product.pk, quantity)
+                return Order.objects.create(
+                    buyer_id=buyer.pk, seller_id=product.seller_id, product=product,
+                    quantity=quantity, unit_price=product.effective_price,
+                )
+        except admission.LeaseLost:
+            raise InsufficientStock([product.pk])
+        except Exception:
+            admission.gate.give_back(product.pk, quantity)
+            raise
+    with transaction.atomic():
+        products = Product.objects.filter(pk=product.pk)
+        # Как в checkout_cart: сначала запись, затем остаток и цена читаются
+        # заново под блокировкой, а не из экземпляра сериализатора
+        if not products.update(quantity=F('quantity')):
+            raise InsufficientStock([product.pk])
+        product = products.select_for_update().get()
+        return place_orders(buyer, [(product, quantity)])[0]
+
+
+def checkout_cart(buyer):
+    with transaction.atomic():
+        cart_items = CartItem.objects.filter(cart__user_id=buyer.pk)
+        # Сначала запись: в SQLite транзакция сразу берёт блокировку на запись
+        # и не упирается в deadlock при параллельных оформлениях
+        if not cart_items.update(quantity=F('quantity')):
+            raise EmptyCart()
+        items = list(
+            cart_items.select_related('product').select_for_update(of=('self', 'product'))
+        )
+        orders = place_orders(buyer, [(item.product, item.quantity) for item in items])
+        CartItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+    return orders
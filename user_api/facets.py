@@ -0,0 +1,94 @@
+import hashlib
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, Count, IntegerField, Value, When
+
+
+def _normalize(value):
+    # 1000 и 1000.0 — один фильтр; для объектов (категория, продавец) берём pk
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    return str(getattr(value, 'pk', value))
+
+
+def filter_key(cleaned_data):
+    """Нормализованный ключ набора фильтров: пустые и ?ordering= не влияют на счётчики."""
+    items = sorted(
+        (name, _normalize(value))
+        for name, value in cleaned_data.items()
+        if name != 'ordering' and value not in (None, '', [])
+    )
+    return hashlib.sha1(repr(items).encode()).hexdigest()
+
+
+def _bucket(field, edges):
+    # Номер интервала: сколько границ не больше значения
+    return Case(
+        *[When(**{f'{field}__lt': edge}, then=Value(index)) for index, edge in enumerate(edges)],
+        default=Value(len(edges)),
+        output_field=IntegerField(),
+    )
+
+
+def _ranges(counts, edges):
+    # Цена и скидка неотрицательны, верхний интервал открыт
+    bounds = [0, *edges, None]
+    return [
+        {'min': bounds[index], 'max': bounds[index + 1], 'count': counts[index]}
+        for index in range(len(edges) + 1)
+        if counts[index]
+    ]
+
+
+def compute(queryset):
+    """Все счётчики одним запросом.
+
+    Группируем сразу по категории, продавцу, интервалу цены и скидки,
+    а по каждому измерению суммируем уже в Python: строк в ответе не больше,
+    чем различных сочетаний, и обычно много меньше, чем товаров.
+    """
+    price_edges = settings.FACET_PRICE_EDGES
+    discount_edges = settings.FACET_DISCOUNT_EDGES
+    rows = (
+        queryset.order_by()
+        .values(
+            'category_id', 'category__name', 'seller_id', 'seller__username',
+            price_bucket=_bucket('effective_price', price_edges),
+            discount_band=_bucket('discount', discount_edges),
+        )
+        .annotate(count=Count('id'))
+    )
+    categories, sellers = {}, {}
+    prices, discounts = defaultdict(int), defaultdict(int)
+    total = 0
+    for row in rows:
+        count = row['count']
+        total += count
+        category = categories.setdefault(row['category_id'], {'id': row['category_id'], 'name': row['category__name'], 'count': 0})
+        category['count'] += count
+        seller = sellers.setdefault(row['seller_id'], {'id': row['seller_id'], 'name': row['seller__username'], 'count': 0})
+        seller['count'] += count
+        prices[row['price_bucket']] += count
+        discounts[row['discount_band']] += count
+    by_count = lambda facet: (-facet['count'], facet['id'])
+    return {
+        'total': total,
+        'categories': sorted(categories.values(), key=by_count),
+        'sellers': sorted(sellers.values(), key=by_count),
+        'effective_price': _ranges(prices, price_edges),
+        'discount': _ranges(discounts, discount_edges),
+    }
+
+
+def get(version, key, build):
+    # Версия таблицы в ключе: после изменения товаров старые записи просто не читаются
+    cache = caches['snapshots']
+    name = f'facets:{version}:{key}'
+    facets = cache.get(name)
+    if facets is None:
+        facets = build()
+        cache.set(name, facets, settings.FACETS_CACHE_TTL)
+    return facets
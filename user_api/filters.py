@@ -5,7 +5,13 @@ class ProductFilter(filters.FilterSet):
     min_price = filters.NumberFilter(field_name="price", lookup_expr='gte')
     max_price = filters.NumberFilter(field_name="price", lookup_expr='lte')
     price = filters.NumberFilter(field_name="price", lookup_expr='exact')
+    min_effective_price = filters.NumberFilter(field_name="effective_price", lookup_expr='gte')
+    max_effective_price = filters.NumberFilter(field_name="effective_price", lookup_expr='lte')
+    # Только сортировки, которые обслуживаются индексами Product
+    ordering = filters.OrderingFilter(fields=('id', 'price', 'effective_price', 'expiry_date'))
 
     class Meta:
         model = Product
+        # Каждый фильтр обслуживается индексом Product. description и composition —
+        # точное совпадение; поиск по словам — через /products/search/
         fields = ['name', 'description', 'composition', 'discount', 'quantity', 'weight', 'price', 'manufacture_date', 'expiry_date', 'seller', 'category']
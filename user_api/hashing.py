@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingOverloaded(APIException):
+    # DRF выставит Retry-After по атрибуту wait
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервис входа перегружен, повторите попытку позже.'
+    default_code = 'hashing_overloaded'
+
+    def __init__(self):
+        super().__init__()
+        self.wait = settings.PASSWORD_HASHING_RETRY_AFTER
+
+
+def _percentile_ms(samples, fraction):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(int(len(samples) * fraction), len(samples) - 1)] * 1000, 1)
+
+
+class HashingPool:
+    """Ограниченный пул для PBKDF2.
+
+    Хеширование занимает сотни миллисекунд процессора; без пула волна входов
+    занимает все потоки WSGI. Здесь одновременно считаются не больше workers
+    хешей и ждут не больше max_queue, остальным сразу отвечаем 503.
+    hashlib отпускает GIL, поэтому хватает потоков.
+    """
+
+    SAMPLES = 1000
+
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._depth = 0
+        self._max_depth = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_times = deque(maxlen=self.SAMPLES)
+        self._hash_times = deque(maxlen=self.SAMPLES)
+
+    def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashingOverloaded()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hashing')
+            self._depth += 1
+            self._max_depth = max(self._max_depth, self._depth)
+        submitted = time.perf_counter()
+        try:
+            return self._executor.submit(self._timed, func, args, submitted).result()
+        finally:
+            with self._lock:
+                self._depth -= 1
+            self._slots.release()
+
+    def _timed(self, func, args, submitted):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._completed += 1
+                self._wait_times.append(started - submitted)
+                self._hash_times.append(finished - started)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'depth': self._depth,
+                'max_depth': self._max_depth,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'wait_p50_ms': _percentile_ms(self._wait_times, 0.5),
+                'wait_p99_ms': _percentile_ms(self._wait_times, 0.99),
+                'hash_p50_ms': _percentile_ms(self._hash_times, 0.5),
+                'hash_p99_ms': _percentile_ms(self._hash_times, 0.99),
+            }
+
+
+pool = HashingPool(settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_MAX_QUEUE)
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 из Django, но посчитанный в пуле: формат хешей не меняется."""
+
+    # verify() базового класса вызывает encode(), поэтому в пул отдаём
+    # обычный хешер, иначе задача пула ждала бы другую задачу пула
+    _hasher = PBKDF2PasswordHasher()
+
+    def encode(self, password, salt, iterations=None):
+        return pool.run(self._hasher.encode, password, salt, iterations)
+
+    def verify(self, password, encoded):
+        return pool.run(self._hasher.verify, password, encoded)
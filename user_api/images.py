@@ -0,0 +1,121 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Размеры (по длинной стороне) и форматы уменьшенных копий
+SIZES = (64, 256, 1024)
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+DERIVATIVES_DIR = 'derivatives'
+# Сколько секунд помнить неполный набор копий: их может создать другой процесс
+PENDING_TIMEOUT = 30
+
+_executor = None
+
+
+def derivative_name(name, size, fmt):
+    stem = os.path.splitext(name)[0]
+    return f'{DERIVATIVES_DIR}/{stem}_{size}.{FORMATS[fmt][1]}'
+
+
+def derivative_urls(name):
+    # Пока копия не создана (или не создалась), ссылка ведёт на оригинал.
+    # Набор ссылок кэшируется: хранилище проверяется раз на изображение, а не на ответ
+    cache = caches['image_derivatives']
+    urls = cache.get(name)
+    if urls is not None:
+        return urls
+    original = default_storage.url(name)
+    urls = {}
+    complete = True
+    for size in SIZES:
+        urls[str(size)] = {}
+        for fmt in FORMATS:
+            derivative = derivative_name(name, size, fmt)
+            if default_storage.exists(derivative):
+                urls[str(size)][fmt] = default_storage.url(derivative)
+            else:
+                urls[str(size)][fmt] = original
+                complete = False
+    if complete:
+        cache.set(name, urls)
+    else:
+        cache.set(name, urls, PENDING_TIMEOUT)
+    return urls
+
+
+def forget(name):
+    # Копии созданы: следующий ответ перечитает их из хранилища
+    caches['image_derivatives'].delete(name)
+
+
+def render(source, targets):
+    """Сохраняет уменьшенные копии source. Выполняется в отдельном процессе."""
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        for path, size, pil_format in targets:
+            copy = image.copy()
+            copy.thumbnail((size, size), Image.Resampling.LANCZOS)
+            if pil_format == 'JPEG' and copy.mode != 'RGB':
+                copy = copy.convert('RGB')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            copy.save(path, pil_format, quality=80, optimize=True)
+
+
+def pending_targets(name, force=False):
+    targets = []
+    for size in SIZES:
+        for fmt, (pil_format, _) in FORMATS.items():
+            path = default_storage.path(derivative_name(name, size, fmt))
+            if force or not os.path.exists(path):
+                targets.append((path, size, pil_format))
+    return targets
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # fork многопоточного процесса сервера копирует чужие блокировки и соединения
+        # с БД; forkserver порождает рабочие процессы из чистого процесса
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+            mp_context=multiprocessing.get_context(method),
+        )
+    return _executor
+
+
+def _on_rendered(name):
+    def callback(future):
+        if future.exception() is not None:
+            logger.error('Не удалось создать копии %s', name, exc_info=future.exception())
+        else:
+            forget(name)
+    return callback
+
+
+def schedule(field_file):
+    # Копии создаются после коммита, вне потока обработки запроса
+    if not field_file:
+        return
+    name = field_file.name
+    targets = pending_targets(name)
+    if not targets:
+        return
+
+    def submit():
+        future = get_executor().submit(render, default_storage.path(name), targets)
+        future.add_done_callback(_on_rendered(name))
+
+    transaction.on_commit(submit)
@@ -0,0 +1,72 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from user_api.autocomplete import PrefixIndex
+
+WORDS = (
+    'конфеты', 'шоколад', 'печенье', 'зефир', 'мармелад', 'пастила', 'халва', 'вафли', 'пряник', 'торт',
+    'молочный', 'горький', 'белый', 'ореховый', 'клубничный', 'вишнёвый', 'ванильный', 'карамельный',
+    'мини', 'большой', 'праздничный', 'классический', 'домашний', 'фруктовый', 'медовый', 'лимонный',
+)
+
+
+def names(count, seed):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield f'{" ".join(rng.sample(WORDS, rng.randint(1, 3)))} {i}'
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    p50 = timings[len(timings) // 2] * 1e6
+    p99 = timings[min(int(len(timings) * 0.99), len(timings) - 1)] * 1e6
+    return f'p50 {p50:.0f} мкс, p99 {p99:.0f} мкс'
+
+
+class Command(BaseCommand):
+    help = ('Микробенчмарк индекса подсказок на синтетических названиях, без БД: '
+            'построение, первый и повторный запрос по префиксу, точечное обновление')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=500000)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        count, queries = options['names'], options['queries']
+        rng = random.Random(options['seed'])
+        index = PrefixIndex()
+        started = time.perf_counter()
+        # То же, что _load(), но из сгенерированных названий
+        for pk, name in enumerate(names(count, options['seed']), start=1):
+            index._put(('product', pk), name, (pk % 7 != 0, pk % 50), sort=False)
+        index._keys.sort()
+        index._built = True
+        self.stdout.write(f'Построение: {count} названий, {len(index._keys)} терминов за {time.perf_counter() - started:.1f} с')
+
+        prefixes = [rng.choice(WORDS)[:rng.randint(1, 6)] for _ in range(queries)]
+        for cached in (False, True):
+            timings = []
+            for prefix in prefixes:
+                if not cached:
+                    index._cache.clear()
+                started = time.perf_counter()
+                index.suggest(prefix)
+                timings.append(time.perf_counter() - started)
+            label = 'Повторный запрос (из кэша)' if cached else 'Первый запрос префикса'
+            self.stdout.write(f'{label}: {percentiles(timings)}')
+            # Перед замером кэша все префиксы уже запрошены
+            for prefix in prefixes:
+                index.suggest(prefix)
+
+        # Изменение остатка или скидки, как после оформления заказа
+        timings = []
+        for _ in range(queries):
+            pk = rng.randint(1, count)
+            name = index._entries[('product', pk)][0]
+            started = time.perf_counter()
+            index.update('product', pk, name, (rng.random() < 0.5, rng.randint(0, 90)))
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(f'Точечное обновление при {len(index._cache)} префиксах в кэше: {percentiles(timings)}')
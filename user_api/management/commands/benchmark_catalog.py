@@ -0,0 +1,117 @@
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from user_api.models import Product
+
+
+def _host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+def call_wsgi(application, target, method='GET', headers=None, body=b''):
+    """Выполняет запрос к WSGI-приложению в этом потоке, возвращает (статус, секунды)."""
+    url = urlsplit(target)
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': url.path, 'QUERY_STRING': url.query,
+        'SERVER_NAME': _host(), 'SERVER_PORT': '80', 'HTTP_HOST': _host(),
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(body),
+        'CONTENT_LENGTH': str(len(body)), 'CONTENT_TYPE': 'application/json',
+        'wsgi.errors': io.StringIO(), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+        'wsgi.run_once': False, 'wsgi.version': (1, 0),
+        **{'HTTP_' + name.upper().replace('-', '_'): value for name, value in (headers or {}).items()},
+    }
+    statuses = []
+    started = time.perf_counter()
+    response = application(environ, lambda status, response_headers, exc_info=None: statuses.append(status))
+    b''.join(response)
+    response.close()
+    return int(statuses[0].split()[0]), time.perf_counter() - started
+
+
+def summary(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+    return f'{name}: {len(latencies) / elapsed:.0f} запросов/с, p50 {p50:.1f} мс, p99 {p99:.1f} мс'
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает чтение каталога через WSGI (синхронные представления) и ASGI (асинхронные)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Запрашиваемый путь, можно указать несколько раз')
+        parser.add_argument('--token', help='JWT для путей, требующих аутентификации')
+
+    def handle(self, *args, **options):
+        paths = options['paths']
+        if not paths:
+            product_id = Product.objects.values_list('pk', flat=True).first()
+            paths = ['/products/'] + ([f'/products/{product_id}/'] if product_id else [])
+        count, concurrency = options['requests'], options['concurrency']
+        targets = [paths[i % len(paths)] for i in range(count)]
+        headers = {'authorization': f'Bearer {options["token"]}'} if options['token'] else {}
+
+        self.stdout.write(f'{count} запросов, {concurrency} одновременно: {", ".join(paths)}')
+        self.stdout.write(self.run_wsgi(targets, concurrency, headers))
+        self.stdout.write(asyncio.run(self.run_asgi(targets, concurrency, headers)))
+
+    def run_wsgi(self, targets, concurrency, headers):
+        from backend.wsgi import application
+
+        def call(target):
+            return call_wsgi(application, target, headers=headers)[1]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            latencies = list(executor.map(call, targets))
+        return summary('WSGI', latencies, time.perf_counter() - started)
+
+    async def run_asgi(self, targets, concurrency, headers):
+        from backend.asgi import application
+
+        semaphore = asyncio.Semaphore(concurrency)
+        scope_headers = [(b'host', _host().encode())] + [
+            (name.encode(), value.encode()) for name, value in headers.items()
+        ]
+
+        async def call(target):
+            url = urlsplit(target)
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': url.path, 'raw_path': url.path.encode(), 'root_path': '',
+                'query_string': url.query.encode(), 'headers': scope_headers,
+                'server': (_host(), 80), 'client': ('127.0.0.1', 0),
+            }
+            finished = asyncio.Event()
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await finished.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.body' and not message.get('more_body'):
+                    finished.set()
+
+            async with semaphore:
+                started = time.perf_counter()
+                await application(scope, receive, send)
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*[call(target) for target in targets])
+        return summary('ASGI', latencies, time.perf_counter() - started)
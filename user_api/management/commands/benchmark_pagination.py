@@ -0,0 +1,104 @@
+import time
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.pagination import Cursor
+
+from user_api.models import AppUser, Category, Product
+from user_api.pagination import ProductCursorPagination
+from user_api.views import ProductListCreateAPIView
+
+
+class _Rollback(Exception):
+    pass
+
+
+def fill(total, seller_id, category_id):
+    """Догоняет число товаров до total одним INSERT ... SELECT из рекурсивного CTE."""
+    missing = total - Product.objects.count()
+    if missing <= 0:
+        return
+    table = connection.ops.quote_name(Product._meta.db_table)
+    # Цен всего 100 разных: страницы по ?ordering=price состоят из одинаковых значений
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s) '
+            f'INSERT INTO {table} (name, description, composition, discount, quantity, weight, price, '
+            f'manufacture_date, expiry_date, photos, seller_id, category_id, is_flash_sale, updated_at) '
+            f"SELECT 'Товар ' || n, '', '', n %% 50, n %% 100, 1.0, 50 + n %% 100, %s, %s, NULL, %s, %s, 0, %s FROM seq",
+            [missing, date(2026, 1, 1), date(2027, 1, 1), seller_id, category_id,
+             connection.ops.adapt_datetimefield_value(timezone.now())],
+        )
+
+
+class Command(BaseCommand):
+    help = ('Задержка первой и глубокой страницы /products/ при росте каталога: курсор (keyset) '
+            'против OFFSET на той же глубине. Товары создаются во внешней транзакции и откатываются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+        parser.add_argument('--ordering', action='append', dest='orderings', help='По умолчанию id и price')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        seller_id = AppUser.objects.values_list('pk', flat=True).first()
+        category_id = Category.objects.values_list('pk', flat=True).first()
+        if seller_id is None or category_id is None:
+            raise CommandError('Нужны хотя бы один пользователь и одна категория')
+        orderings = options['orderings'] or ['id', 'price']
+        # Без ограничения частоты: меряем запрос, а не корзину токенов
+        self.view = ProductListCreateAPIView.as_view(throttle_classes=[])
+        self.page_size = options['page_size']
+        self.repeat = options['repeat']
+        try:
+            with transaction.atomic():
+                for size in sorted(options['sizes']):
+                    fill(size, seller_id, category_id)
+                    for ordering in orderings:
+                        self.stdout.write(self.measure(size, ordering))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def median_ms(self, func):
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return sorted(timings)[len(timings) // 2] * 1000
+
+    def get(self, query):
+        request = RequestFactory().get('/products/', query)
+        response = self.view(request)
+        response.render()
+        assert response.status_code == 200, response.status_code
+
+    def measure(self, size, ordering):
+        keys = (ordering, 'id') if ordering != 'id' else ('id',)
+        depth = size * 9 // 10
+        query = {'ordering': ordering, 'page_size': str(self.page_size)}
+        # Курсор, указывающий на запись на 90% глубины, как после долгого листания
+        row = Product.objects.order_by(*keys).values(*keys)[depth]
+        paginator = ProductCursorPagination()
+        paginator.base_url = 'http://localhost/products/'
+        paginator.ordering = keys
+        position = paginator._get_position_from_instance(row, keys)
+        url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+        cursor = parse_qs(urlsplit(url).query)['cursor'][0]
+        first = self.median_ms(lambda: self.get(query))
+        deep = self.median_ms(lambda: self.get({**query, 'cursor': cursor}))
+        # Только выборка из БД, без сериализации: keyset против OFFSET
+        ordered = Product.objects.order_by(*keys)
+        seek = ordered.filter(paginator._keyset_filter(position, reverse=False))
+        keyset = self.median_ms(lambda: list(seek[:self.page_size]))
+        offset = self.median_ms(lambda: list(ordered[depth:depth + self.page_size]))
+        return (
+            f'{size:>8} товаров, ordering={ordering}: ответ API — первая страница {first:.1f} мс, '
+            f'на глубине {depth} {deep:.1f} мс; выборка — keyset {keyset:.1f} мс, OFFSET {offset:.1f} мс'
+        )
@@ -0,0 +1,75 @@
+import csv
+import io
+from contextlib import nullcontext
+import json
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from user_api import bulk
+from user_api.models import AppUser, Category, Product
+
+
+def generate(rows, fmt, category_ids):
+    """Файл импорта в памяти: rows правдоподобных товаров."""
+    today = date.today()
+    records = (
+        {
+            'name': f'Товар {i}', 'description': f'Описание товара {i}', 'composition': 'мука, сахар',
+            'discount': i % 60, 'quantity': i % 500, 'weight': 0.25 + i % 10, 'price': f'{50 + i % 2000}.{i % 100:02d}',
+            'manufacture_date': str(today - timedelta(days=i % 30)), 'expiry_date': str(today + timedelta(days=30 + i % 300)),
+            'category': category_ids[i % len(category_ids)], 'is_flash_sale': False,
+        }
+        for i in range(rows)
+    )
+    if fmt == 'ndjson':
+        return io.BytesIO(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode())
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=bulk.IMPORT_FIELDS)
+    writer.writeheader()
+    writer.writerows(records)
+    return io.BytesIO(text.getvalue().encode())
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Измеряет скорость импорта товаров. По умолчанию всё откатывается в конце, '
+            'пачки при этом фиксируются точками сохранения, а не отдельными транзакциями')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seller', required=True, help='Email продавца')
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--format', choices=bulk.FORMATS, default='csv')
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--commit', action='store_true', help='Оставить созданные товары в БД')
+
+    def handle(self, *args, **options):
+        seller_id = AppUser.objects.filter(email=options['seller']).values_list('pk', flat=True).first()
+        if seller_id is None:
+            raise CommandError(f'Пользователь {options["seller"]} не найден')
+        category_ids = list(Category.objects.values_list('pk', flat=True))
+        if not category_ids:
+            raise CommandError('Нет ни одной категории')
+        stream = generate(options['rows'], options['format'], category_ids)
+        before = Product.objects.count()
+        # Без --commit всё выполняется во внешней транзакции и откатывается
+        context = nullcontext() if options['commit'] else transaction.atomic()
+        try:
+            with context:
+                started = time.perf_counter()
+                report = bulk.import_products(stream, options['format'], seller_id, options['batch_size'])
+                elapsed = time.perf_counter() - started
+                created = Product.objects.count() - before
+                if not options['commit']:
+                    raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write(
+            f'{options["format"]}: {report.created} строк за {elapsed:.2f} с, '
+            f'{report.created / elapsed:.0f} строк/с, ошибок: {report.failed}, в БД появилось: {created}'
+        )
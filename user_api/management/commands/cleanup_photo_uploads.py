@@ -0,0 +1,48 @@
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from user_api import uploads
+from user_api.models import PhotoUpload
+
+
+class Command(BaseCommand):
+    help = ('Удаляет брошенные загрузки фотографий: строки PhotoUpload старше срока вместе '
+            'с их .part-файлами и временные файлы без загрузки. Запускать по расписанию')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=settings.PHOTO_UPLOAD_EXPIRY,
+                            help='Возраст в секундах, по умолчанию PHOTO_UPLOAD_EXPIRY')
+
+    def handle(self, *args, **options):
+        max_age = options['max_age']
+        expired = PhotoUpload.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=max_age))
+        rows = 0
+        for upload in expired.iterator():
+            uploads.discard(upload)
+            rows += 1
+
+        # Файлы, для которых строки уже нет: загрузку удалили при сбое, или
+        # процесс упал, не убрав принятую часть (.chunk)
+        files = 0
+        directory = settings.PHOTO_UPLOAD_TEMP_DIR
+        if os.path.isdir(directory):
+            # .part новой загрузки появляется после её строки: файл старше списка
+            # строк без своей строки точно брошен
+            listed_at = time.time()
+            known = {str(pk) for pk in PhotoUpload.objects.values_list('pk', flat=True).iterator()}
+            deadline = listed_at - max_age
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    modified = entry.stat().st_mtime
+                    orphan = entry.name.endswith('.part') and entry.name.split('.', 1)[0] not in known
+                    if modified < deadline or (orphan and modified < listed_at):
+                        os.remove(entry.path)
+                        files += 1
+        self.stdout.write(self.style.SUCCESS(f'Удалено загрузок: {rows}, файлов: {files}'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from user_api.models import AppUser, Category, Product
+from user_api.storage import content_storage, is_content_addressed
+
+IMAGE_FIELDS = (
+    (Product, 'photos'),
+    (Category, 'image'),
+    (AppUser, 'avatar'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Переносит загруженные изображения под имена по хэшу содержимого и удаляет дубликаты'
+
+    def handle(self, *args, **options):
+        moved = removed = 0
+        for model, field in IMAGE_FIELDS:
+            names = (
+                model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                .values_list(field, flat=True).distinct()
+            )
+            for name in list(names):
+                if is_content_addressed(name) or not content_storage.exists(name):
+                    continue
+                with content_storage.open(name) as file:
+                    new_name = content_storage.save(name, file)
+                model.objects.filter(**{field: name}).update(**{field: new_name})
+                moved += 1
+                if not any(m.objects.filter(**{f: name}).exists() for m, f in IMAGE_FIELDS):
+                    content_storage.delete(name)
+                    removed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено: {moved}, удалено старых файлов: {removed}. '
+            'Уменьшенные копии создаст generate_image_derivatives.'
+        ))
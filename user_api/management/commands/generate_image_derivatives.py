@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from user_api import images
+from user_api.models import AppUser, Category, Product
+
+IMAGE_FIELDS = (
+    (Product, 'photos'),
+    (Category, 'image'),
+    (AppUser, 'avatar'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии для уже загруженных изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Пересоздать существующие копии')
+
+    def handle(self, *args, **options):
+        names = set()
+        for model, field in IMAGE_FIELDS:
+            names.update(
+                model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                .values_list(field, flat=True).iterator()
+            )
+        executor = images.get_executor()
+        futures = {}
+        for name in sorted(names):
+            targets = images.pending_targets(name, force=options['force'])
+            if targets:
+                futures[name] = executor.submit(images.render, images.default_storage.path(name), targets)
+        failed = 0
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'{name}: {e}')
+            else:
+                images.forget(name)
+        self.stdout.write(self.style.SUCCESS(f'Обработано изображений: {len(futures) - failed}, ошибок: {failed}'))
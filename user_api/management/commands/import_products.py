@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user_api import bulk
+from user_api.models import AppUser
+
+
+class Command(BaseCommand):
+    help = 'Импортирует товары продавца из CSV или NDJSON (файл читается построчно)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для стандартного ввода')
+        parser.add_argument('--seller', required=True, help='Email продавца')
+        parser.add_argument('--format', choices=bulk.FORMATS, help='По умолчанию по расширению файла')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        seller_id = AppUser.objects.filter(email=options['seller']).values_list('pk', flat=True).first()
+        if seller_id is None:
+            raise CommandError(f'Пользователь {options["seller"]} не найден')
+        fmt = options['format'] or bulk.format_for(options['path'])
+        if options['path'] == '-':
+            report = bulk.import_products(sys.stdin.buffer, fmt, seller_id, options['batch_size'])
+        else:
+            with open(options['path'], 'rb') as stream:
+                report = bulk.import_products(stream, fmt, seller_id, options['batch_size'])
+        for error in report.errors:
+            self.stderr.write(f'Строка {error["line"]}: {error["errors"]}')
+        style = self.style.SUCCESS if not report.failed else self.style.WARNING
+        self.stdout.write(style(f'Создано товаров: {report.created}, строк с ошибками: {report.failed}'))
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from user_api import admission, stats
+from user_api.models import AppUser, FlashSaleLease, Order, Product
+from user_api.views import OrderListCreateAPIView
+
+from .benchmark_catalog import summary
+
+
+class Command(BaseCommand):
+    help = ('Волна заказов одного товара флеш-распродажи: все --orders запросов поставлены '
+            'в очередь потоков сервера разом. Проверяет, что продано не больше остатка и '
+            'после возврата аренды остаток сходится. Созданные заказы затем удаляются')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyer', required=True, help='Email покупателя')
+        parser.add_argument('--product', type=int, help='По умолчанию первый товар')
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--stock', type=int, default=1000, help='Остаток товара перед волной')
+        parser.add_argument('--workers', type=int, default=64, help='Потоков сервера')
+
+    def handle(self, *args, **options):
+        buyer = AppUser.objects.filter(email=options['buyer']).first()
+        if buyer is None:
+            raise CommandError(f'Пользователь {options["buyer"]} не найден')
+        products = Product.objects.filter(pk=options['product']) if options['product'] else Product.objects.order_by('pk')
+        product = products.first()
+        if product is None:
+            raise CommandError('Товар не найден')
+        stock = options['stock']
+        saved = (product.quantity, product.is_flash_sale)
+        last_order_id = Order.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        Product.objects.filter(pk=product.pk).update(quantity=stock, is_flash_sale=True)
+        admission.gate.reset(product.pk)
+
+        # Без ограничения частоты: один покупатель изображает всю волну
+        view = OrderListCreateAPIView.as_view(throttle_classes=[])
+        factory = APIRequestFactory()
+        statuses = Counter()
+        latencies = []
+        lock = threading.Lock()
+
+        def place(submitted):
+            request = factory.post('/orders/', {'product': product.pk, 'quantity': 1}, format='json')
+            force_authenticate(request, user=buyer)
+            try:
+                status = view(request).status_code
+            except Exception as e:
+                status = type(e).__name__
+            with lock:
+                statuses[status] += 1
+                # Задержка с учётом ожидания свободного потока сервера
+                latencies.append(time.perf_counter() - submitted)
+
+        server = ThreadPoolExecutor(options['workers'])
+        started = time.perf_counter()
+        futures = [server.submit(place, time.perf_counter()) for _ in range(options['orders'])]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+        server.submit(connection.close)
+        server.shutdown()
+
+        self.stdout.write(f'Товар {product.pk}, остаток {stock}, потоков сервера: {options["workers"]}')
+        self.stdout.write(summary('заказы', latencies, elapsed))
+        self.stdout.write(f'Ответы: {dict(statuses)}')
+        admission.gate.release_all()
+        sold = Order.objects.filter(pk__gt=last_order_id, product=product).aggregate(units=Sum('quantity'))['units'] or 0
+        left = Product.objects.values_list('quantity', flat=True).get(pk=product.pk)
+        leased = FlashSaleLease.objects.filter(product=product).aggregate(units=Sum('quantity'))['units'] or 0
+        self.stdout.write(f'Продано {sold}, в товаре {left}, в чужой аренде {leased}, ответов 201: {statuses[201]}')
+        if sold > stock or sold != statuses[201] or sold + left + leased != stock:
+            raise CommandError('Остаток не сходится с заказами')
+
+        # Возвращаем БД в исходное состояние; итоги продаж выводятся из заказов
+        Order.objects.filter(pk__gt=last_order_id, product=product).delete()
+        Product.objects.filter(pk=product.pk).update(quantity=saved[0], is_flash_sale=saved[1])
+        stats.rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS('Остаток сходится'))
@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from user_api import hashing
+from user_api.models import Product
+
+from .benchmark_catalog import call_wsgi, summary
+
+
+class Command(BaseCommand):
+    help = ('Измеряет задержку чтения каталога до и во время волны входов. '
+            'Потоки --workers изображают потоки WSGI-сервера, общие для всех запросов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--clients', type=int, default=8, help='Одновременных клиентов каталога')
+        parser.add_argument('--requests', type=int, default=100, help='Запросов каталога на клиента')
+        parser.add_argument('--logins', type=int, default=64, help='Одновременных попыток входа')
+        parser.add_argument('--path', help='Путь каталога, по умолчанию карточка первого товара')
+        parser.add_argument('--inline-hashing', action='store_true',
+                            help='Хешировать в потоке запроса, без пула (для сравнения)')
+
+    def handle(self, *args, **options):
+        from backend.wsgi import application
+
+        path = options['path'] or f'/products/{Product.objects.values_list("pk", flat=True).first()}/'
+        login_body = json.dumps({'email': options['email'], 'password': options['password']}).encode()
+        if options['inline_hashing']:
+            hashing.pool.run = lambda func, *args: func(*args)
+        server = ThreadPoolExecutor(options['workers'])
+
+        def catalog_client(latencies):
+            for _ in range(options['requests']):
+                submitted = time.perf_counter()
+                server.submit(call_wsgi, application, path).result()
+                # Задержка с учётом ожидания свободного потока сервера
+                latencies.append(time.perf_counter() - submitted)
+
+        def run_catalog():
+            latencies = []
+            clients = [threading.Thread(target=catalog_client, args=(latencies,)) for _ in range(options['clients'])]
+            started = time.perf_counter()
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+            return summary('каталог', latencies, time.perf_counter() - started)
+
+        self.stdout.write(f'{path}, потоков сервера: {options["workers"]}, клиентов каталога: {options["clients"]}')
+        self.stdout.write('Без нагрузки: ' + run_catalog())
+
+        statuses = Counter()
+        storming = threading.Event()
+        storming.set()
+
+        def login_client():
+            while storming.is_set():
+                status, _ = server.submit(call_wsgi, application, '/login/', 'POST', body=login_body).result()
+                statuses[status] += 1
+                if status == 503:
+                    # Клиент выполняет Retry-After
+                    time.sleep(settings.PASSWORD_HASHING_RETRY_AFTER)
+
+        storm = [threading.Thread(target=login_client) for _ in range(options['logins'])]
+        for client in storm:
+            client.start()
+        time.sleep(0.5)
+        self.stdout.write('Во время входов: ' + run_catalog())
+        storming.clear()
+        for client in storm:
+            client.join()
+        server.shutdown()
+        self.stdout.write(f'Ответы на вход: {dict(statuses)}')
+        self.stdout.write(f'Пул хеширования: {hashing.pool.metrics()}')
@@ -0,0 +1,58 @@
+import json
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from user_api import images
+from user_api.views import ProductListCreateAPIView
+
+
+def stored_size(url):
+    # Ссылка из ответа API → файл в хранилище
+    name = unquote(urlsplit(url).path)[len(settings.MEDIA_URL):]
+    return default_storage.size(name)
+
+
+class Command(BaseCommand):
+    help = ('Сколько байт скачивает клиент за страницу /products/: JSON и фото товаров '
+            'в оригинале против уменьшенных копий выбранного размера и формата')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=1)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--size', type=int, choices=images.SIZES, default=256)
+        parser.add_argument('--format', choices=images.FORMATS, default='webp')
+
+    def handle(self, *args, **options):
+        view = ProductListCreateAPIView.as_view(throttle_classes=[])
+        size, fmt = str(options['size']), options['format']
+        query = {'page_size': str(options['page_size'])}
+        pages = json_bytes = originals = derivatives = photos = missing = 0
+        while pages < options['pages']:
+            response = view(RequestFactory().get('/products/', query))
+            response.render()
+            data = json.loads(response.content)
+            pages += 1
+            json_bytes += len(response.content)
+            for product in data['results']:
+                if not product['photos']:
+                    continue
+                photos += 1
+                url = product['photos_derivatives'][size][fmt]
+                # Копии ещё нет: поле отдаёт оригинал
+                missing += url == product['photos']
+                originals += stored_size(product['photos'])
+                derivatives += stored_size(url)
+            if not data['next']:
+                break
+            query['cursor'] = parse_qs(urlsplit(data['next']).query)['cursor'][0]
+
+        self.stdout.write(f'Страниц: {pages}, фото: {photos}, без копии {size} {fmt}: {missing}')
+        self.stdout.write(f'JSON: {json_bytes / pages / 1024:.1f} КБ на страницу')
+        self.stdout.write(
+            f'До (оригиналы): {(json_bytes + originals) / pages / 1024:.1f} КБ на страницу, '
+            f'после (копии {size} {fmt}): {(json_bytes + derivatives) / pages / 1024:.1f} КБ на страницу'
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from user_api.stats import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает дневные итоги продаж продавцов по всем заказам'
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано строк: {count}'))
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+FTS_TABLE = 'user_api_product_fts'
+
+
+def normalize(text):
+    return (text or '').lower().replace('ё', 'е')
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        "name, description, composition, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    Product = apps.get_model('user_api', 'Product')
+    rows = Product.objects.values_list('pk', 'name', 'description', 'composition')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, composition) VALUES (%s, %s, %s, %s)',
+            [(pk, normalize(name), normalize(description), normalize(composition))
+             for pk, name, description, composition in rows.iterator()],
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0005_product_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0006_product_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_flash_sale',
+            field=models.BooleanField(default=False, verbose_name='Флеш-распродажа'),
+        ),
+    ]
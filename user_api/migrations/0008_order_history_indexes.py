@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0007_product_is_flash_sale'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['buyer', 'date_time'], name='user_api_or_buyer_i_136005_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['seller', 'date_time'], name='user_api_or_seller__dd3585_idx'),
+        ),
+    ]
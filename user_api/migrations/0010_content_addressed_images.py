@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:58
+
+import user_api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0009_sellerdailysales'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appuser',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=user_api.storage.ContentAddressedStorage(), upload_to='avatars/'),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=user_api.storage.ContentAddressedStorage(), upload_to='category_images/'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='photos',
+            field=models.ImageField(blank=True, null=True, storage=user_api.storage.ContentAddressedStorage(), upload_to='product_photos/', verbose_name='Блок фотографий'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-18 01:59
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0010_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('size', models.PositiveBigIntegerField(verbose_name='Размер')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='Загружено байт')),
+                ('format', models.CharField(blank=True, max_length=10, verbose_name='Формат')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Начало загрузки')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Загружает')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='user_api.product', verbose_name='Продукт')),
+            ],
+            options={
+                'verbose_name': 'Загрузка фотографии',
+                'verbose_name_plural': 'Загрузки фотографий',
+            },
+        ),
+    ]
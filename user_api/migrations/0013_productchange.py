@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:02
+
+from django.db import migrations, models
+
+
+def seed_changes(apps, schema_editor):
+    # Клиент с пустым токеном получает весь каталог
+    Product = apps.get_model('user_api', 'Product')
+    ProductChange = apps.get_model('user_api', 'ProductChange')
+    ProductChange.objects.bulk_create(
+        [ProductChange(product_id=pk) for pk in Product.objects.order_by('pk').values_list('pk', flat=True)],
+        batch_size=500,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0012_catalog_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('product_id', models.PositiveBigIntegerField(db_index=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Изменение товара',
+                'verbose_name_plural': 'Изменения товаров',
+            },
+        ),
+        migrations.RunPython(seed_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:40
+
+import django.db.models.expressions
+import django.db.models.functions.math
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0014_cartitem_unique_product'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(100), '-', models.F('discount'))), '/', models.Value(100.0)), 2), output_field=models.DecimalField(decimal_places=2, max_digits=10), verbose_name='Цена со скидкой'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price'], name='user_api_pr_effecti_e12e35_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.6 on 2026-10-18 03:03
+
+import django.db.models.deletion
+import user_api.models
+from django.db import migrations, models
+
+
+FTS_TABLE = 'user_api_product_fts'
+
+
+def set_rank_weights(apps, schema_editor):
+    # Скрытый столбец rank считает bm25 с этими весами: название, описание, состав
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0)')")
+
+
+def reset_rank_weights(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25()')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0016_product_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchEntry',
+            fields=[
+                ('product', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='user_api.product')),
+                ('document', user_api.models.SearchDocumentField(db_column='user_api_product_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'user_api_product_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(set_rank_weights, reset_rank_weights),
+    ]
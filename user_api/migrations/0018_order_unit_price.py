@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-18 03:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_unit_prices(apps, schema_editor):
+    # Цена прошлых заказов не сохранялась: берём текущую цену со скидкой
+    Order = apps.get_model('user_api', 'Order')
+    Product = apps.get_model('user_api', 'Product')
+    Order.objects.update(unit_price=Subquery(
+        Product.objects.filter(pk=OuterRef('product_id')).values('effective_price')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0017_product_search_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Цена за штуку'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_unit_prices, migrations.RunPython.noop),
+    ]
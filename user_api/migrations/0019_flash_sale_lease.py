@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-18 03:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0018_order_unit_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlashSaleLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=100, verbose_name='Процесс')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Истекает')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='flash_sale_leases', to='user_api.product', verbose_name='Продукт')),
+            ],
+            options={
+                'verbose_name': 'Аренда остатка',
+                'verbose_name_plural': 'Аренды остатков',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='flashsalelease',
+            constraint=models.UniqueConstraint(fields=('product', 'owner'), name='unique_flash_sale_lease'),
+        ),
+    ]
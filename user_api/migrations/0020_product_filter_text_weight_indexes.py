@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_api', '0019_flash_sale_lease'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['weight'], name='user_api_pr_weight_c04b02_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['description'], name='user_api_pr_descrip_73b462_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['composition'], name='user_api_pr_composi_276121_idx'),
+        ),
+    ]
@@ -1,12 +1,16 @@
+import uuid
 from decimal import Decimal
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Round
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.forms import ValidationError
 from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import receiver, Signal
 from django.conf import settings
+from .storage import content_storage
 
 class AppUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -39,7 +43,7 @@ class AppUserManager(BaseUserManager):
 class AppUser(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(max_length=50, unique=True)
     username = models.CharField(max_length=50, unique=True)
-    avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    avatar = models.ImageField(upload_to='avatars/', storage=content_storage, null=True, blank=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     USERNAME_FIELD = 'email'
@@ -52,6 +56,13 @@ class AppUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.username
 
+# Товары изменены в обход save(): queryset.update(), bulk_create() и т.п.
+# Аргументы: product_ids, category_ids
+products_updated = Signal()
+# Товары созданы bulk_create() (импорт), post_save не отправлялся.
+# Аргументы: product_ids, category_ids
+products_created = Signal()
+
 @receiver(post_save, sender=AppUser)
 def create_user_cart(sender, instance, created, **kwargs):
     if created:
@@ -60,7 +71,8 @@ def create_user_cart(sender, instance, created, **kwargs):
 class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
-    image = models.ImageField(upload_to='category_images/', null=True, blank=True)
+    image = models.ImageField(upload_to='category_images/', storage=content_storage, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = ('Категория')
@@ -116,6 +128,7 @@ class Product(models.Model):
 	)
     photos = models.ImageField(
         upload_to='product_photos/', 
+        storage=content_storage,
         blank=True, null=True,
         verbose_name=('Блок фотографий'),
     )
@@ -129,16 +142,55 @@ class Product(models.Model):
         on_delete=models.CASCADE, 
         verbose_name=('Категория'),
     )
+    is_flash_sale = models.BooleanField(
+        default=False,
+        verbose_name=('Флеш-распродажа'),
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=('Изменён'),
+    )
+    # Цена со скидкой хранится в столбце, который считает сама БД:
+    # он согласован с price и discount при любой записи, включая update()
+    effective_price = models.GeneratedField(
+        expression=Round(F('price') * (100 - F('discount')) / Value(100.0), 2),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+        verbose_name=('Цена со скидкой'),
+    )
 
     class Meta:
         verbose_name = ('Продукт')
         verbose_name_plural = ('Продукты')
+        # Индексы под фильтры ProductFilter и допустимые ?ordering=
+        indexes = [
+            models.Index(fields=['price']),
+            models.Index(fields=['expiry_date']),
+            models.Index(fields=['category', 'price']),
+            models.Index(fields=['seller', 'expiry_date']),
+            models.Index(fields=['discount', 'price']),
+            models.Index(fields=['effective_price']),
+            models.Index(fields=['name']),
+            models.Index(fields=['quantity']),
+            models.Index(fields=['manufacture_date']),
+            models.Index(fields=['weight']),
+            # Точное совпадение по тексту: ключ укладывается в страницу индекса,
+            # длина полей ограничена max_length
+            models.Index(fields=['description']),
+            models.Index(fields=['composition']),
+            # Любая допустимая сортировка внутри продавца или категории
+            models.Index(fields=['seller', 'price']),
+            models.Index(fields=['seller', 'effective_price']),
+            models.Index(fields=['category', 'effective_price']),
+            models.Index(fields=['category', 'expiry_date']),
+        ]
 
     def __str__(self) -> str:
         return self.name
 
-    def price_with_discount(self) -> float:
-        return self.price * (100 - self.discount) / 100
+    def price_with_discount(self) -> Decimal:
+        # Округлённая БД цена, как в каталоге, корзине и заказах
+        return self.effective_price
 
     price_with_discount.short_description = 'Цена со скидкой'
     
@@ -170,6 +222,13 @@ class Order(models.Model):
         verbose_name=('Количество'),
         default=1
     )
+    # Цена со скидкой на момент заказа: по ней считается выручка,
+    # даже если цену товара потом изменят
+    unit_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name=('Цена за штуку'),
+    )
 
     def clean(self):
         super().clean()
@@ -179,7 +238,153 @@ class Order(models.Model):
     class Meta:
         verbose_name = ('Заказ')
         verbose_name_plural = ('Заказы')
+        # История заказов покупателя и продавца по (date_time, id)
+        indexes = [
+            models.Index(fields=['buyer', 'date_time']),
+            models.Index(fields=['seller', 'date_time']),
+        ]
         
+class FlashSaleLease(models.Model):
+    # Остаток товара флеш-распродажи, забранный процессом и ещё не проданный
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        verbose_name=('Продукт'),
+        related_name='flash_sale_leases'
+    )
+    owner = models.CharField(max_length=100, verbose_name=('Процесс'))
+    quantity = models.PositiveIntegerField(default=0, verbose_name=('Количество'))
+    # Продлевается каждой продажей; истёкшую аренду возвращает любой процесс
+    expires_at = models.DateTimeField(db_index=True, verbose_name=('Истекает'))
+
+    class Meta:
+        verbose_name = ('Аренда остатка')
+        verbose_name_plural = ('Аренды остатков')
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'owner'], name='unique_flash_sale_lease'),
+        ]
+
+class TableVersion(models.Model):
+    # Счётчик изменений таблицы: растёт при каждом сохранении и удалении строк
+    table = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = ('Версия таблицы')
+        verbose_name_plural = ('Версии таблиц')
+
+class SearchDocumentField(models.TextField):
+    # Скрытый столбец FTS5 с именем таблицы: «таблица MATCH запрос»
+    pass
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class ProductSearchEntry(models.Model):
+    # Строка полнотекстового индекса user_api_product_fts (FTS5, только SQLite).
+    # Таблицу ведут миграция 0006 и search.py, модель нужна для JOIN в запросах
+    product = models.OneToOneField(
+        Product,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='search_entry',
+    )
+    document = SearchDocumentField(db_column='user_api_product_fts')
+    # Скрытый столбец FTS5: bm25 с весами колонок из настройки rank (миграция 0017)
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'user_api_product_fts'
+
+
+class ProductChange(models.Model):
+    # Последнее изменение товара; удалённый товар остаётся как tombstone
+    seq = models.BigAutoField(primary_key=True)
+    product_id = models.PositiveBigIntegerField(db_index=True)
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = ('Изменение товара')
+        verbose_name_plural = ('Изменения товаров')
+
+class PhotoUpload(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        verbose_name=('Продукт')
+    )
+    owner = models.ForeignKey(
+        AppUser,
+        on_delete=models.CASCADE,
+        verbose_name=('Загружает')
+    )
+    size = models.PositiveBigIntegerField(verbose_name=('Размер'))
+    offset = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=('Загружено байт')
+    )
+    format = models.CharField(
+        max_length=10,
+        blank=True,
+        verbose_name=('Формат')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=('Начало загрузки')
+    )
+
+    class Meta:
+        verbose_name = ('Загрузка фотографии')
+        verbose_name_plural = ('Загрузки фотографий')
+
+class SellerDailySales(models.Model):
+    seller = models.ForeignKey(
+        AppUser,
+        on_delete=models.CASCADE,
+        verbose_name=('Продавец'),
+        related_name='daily_sales'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        verbose_name=('Продукт')
+    )
+    day = models.DateField(verbose_name=('День'))
+    units = models.PositiveIntegerField(
+        default=0,
+        verbose_name=('Продано штук')
+    )
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name=('Выручка')
+    )
+
+    class Meta:
+        verbose_name = ('Продажи за день')
+        verbose_name_plural = ('Продажи по дням')
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'product', 'day'], name='unique_seller_product_day'),
+        ]
+        indexes = [
+            models.Index(fields=['seller', 'day']),
+        ]
+
 class Cart(models.Model):
     user = models.OneToOneField(AppUser, on_delete=models.CASCADE, related_name='cart')
 
@@ -198,6 +403,10 @@ class CartItem(models.Model):
     class Meta:
         verbose_name = 'Элемент корзины'
         verbose_name_plural = 'Элементы корзины'
+        constraints = [
+            # Один товар — одна строка корзины, повторное добавление меняет количество
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
@@ -0,0 +1,125 @@
+import json
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Курсор по всем полям сортировки, а не только по первому.
+
+    CursorPagination из DRF хранит значение первого поля и смещение, поэтому
+    при множестве одинаковых цен листание снова превращается в OFFSET.
+    Здесь в курсоре лежат значения всех полей (последнее — id, оно уникально),
+    а страница выбирается условием
+    f1 >= v1 AND (f1 > v1 OR f1 = v1 AND f2 > v2 ...): первая часть даёт
+    поиск по индексу на f1, смещение всегда 0. Поля сортировки не NULL.
+    """
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = [
+            instance[field.lstrip('-')] if isinstance(instance, dict) else getattr(instance, field.lstrip('-'))
+            for field in ordering
+        ]
+        return json.dumps([None if value is None else str(value) for value in values])
+
+    def _keyset_filter(self, position, reverse):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        fields = []
+        for order, value in zip(self.ordering, values):
+            # По возрастанию следующие записи больше позиции, по убыванию меньше; назад — наоборот
+            lookup = 'gt' if order.startswith('-') == reverse else 'lt'
+            fields.append((order.lstrip('-'), lookup, value))
+        branches = [
+            Q(**{name: prior for name, _, prior in fields[:index]}, **{f'{name}__{lookup}': value})
+            for index, (name, lookup, value) in enumerate(fields)
+        ]
+        first, lookup, value = fields[0]
+        return Q(**{f'{first}__{lookup}e': value}) & reduce(or_, branches)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Повторяет CursorPagination.paginate_queryset, кроме фильтра по позиции
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            queryset = queryset.filter(self._keyset_filter(current_position, reverse))
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+class ProductCursorPagination(KeysetCursorPagination):
+    # Keyset-пагинация: курсор хранит позицию последней записи,
+    # поэтому глубокие страницы стоят столько же, сколько первая
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('id',)
+
+    def get_ordering(self, request, queryset, view):
+        # Порядок задаёт ProductFilter (?ordering=), id добавляется для однозначности
+        ordering = tuple(queryset.query.order_by) or self.ordering
+        if ordering[-1].lstrip('-') != 'id':
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        return ordering
+
+    def is_requested(self, request):
+        # Пагинация включается явно, чтобы не ломать старых клиентов
+        return (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+
+class ProductSearchPagination(PageNumberPagination):
+    # Результаты поиска упорядочены по релевантности, поэтому постранично
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class OrderCursorPagination(KeysetCursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-date_time', '-id')
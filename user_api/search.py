@@ -0,0 +1,74 @@
+import re
+
+from django.db import connection
+
+FTS_TABLE = 'user_api_product_fts'
+
+# Окончания для лёгкого стемминга русских слов, от длинных к коротким
+RUSSIAN_ENDINGS = sorted((
+    'ыми', 'ими', 'ого', 'его', 'ому', 'ему', 'ами', 'ями',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий', 'ой', 'ую', 'юю',
+    'ых', 'их', 'ым', 'им', 'ом', 'ем', 'ах', 'ях', 'ов', 'ев', 'ей',
+    'ам', 'ям', 'ия', 'ию',
+    'ь', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю',
+), key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def normalize(text):
+    return (text or '').lower().replace('ё', 'е')
+
+
+def stem(token):
+    for ending in RUSSIAN_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= MIN_STEM_LENGTH:
+            return token[:-len(ending)]
+    return token
+
+
+def build_match_query(q):
+    # Каждое слово запроса превращается в префиксный поиск по его основе
+    terms = [stem(token) for token in TOKEN_RE.findall(normalize(q))]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def index_product(product):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, composition) VALUES (%s, %s, %s, %s)',
+            [product.pk, normalize(product.name), normalize(product.description), normalize(product.composition)],
+        )
+
+
+def index_products(products):
+    # Новые товары после bulk_create: старых строк в индексе нет
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, composition) VALUES (%s, %s, %s, %s)',
+            [(pk, normalize(name), normalize(description), normalize(composition))
+             for pk, name, description, composition in products],
+        )
+
+
+def unindex_product(pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def search_products(queryset, q):
+    """Ограничивает queryset совпадениями с q, лучшие совпадения первыми."""
+    match = build_match_query(q)
+    if not match:
+        return queryset.none()
+    if not is_available():
+        return queryset.filter(name__icontains=q).order_by('id')
+    # JOIN с FTS-таблицей через ProductSearchEntry; rank — bm25, где совпадение
+    # в названии весит больше описания и состава (веса задаёт миграция 0017)
+    return queryset.filter(search_entry__document__match=match).order_by('search_entry__rank', 'id')
@@ -1,10 +1,30 @@
+from django.conf import settings
 from django.forms import ValidationError
 from rest_framework import serializers
 from django.contrib.auth import get_user_model, authenticate
-from .models import Product, Category, Order, CartItem, Cart
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from .models import Product, Category, Order, CartItem, Cart, PhotoUpload
+from .images import derivative_urls
+from .authentication import add_claims, get_user
+from .tokens import CachedBlacklistRefreshToken
 
 UserModel = get_user_model()
 
+class ImageDerivativesField(serializers.ReadOnlyField):
+    # Ссылки на уменьшенные копии: {размер: {формат: url}}
+    def to_representation(self, value):
+        if not value:
+            return None
+        urls = derivative_urls(value.name)
+        request = self.context.get('request')
+        if request is not None:
+            urls = {size: {fmt: request.build_absolute_uri(url) for fmt, url in formats.items()}
+                    for size, formats in urls.items()}
+        return urls
+
 class UserRegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserModel
@@ -28,34 +48,135 @@ class UserLoginSerializer(serializers.Serializer):
             raise ValidationError('Неверные учетные данные или пользователь не найден.')
         return user
 
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = CachedBlacklistRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedBlacklistRefreshToken
+
+    # Утверждения переписываются при каждом обновлении,
+    # так блокировка пользователя доходит до новых access-токенов
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user = get_user(access[api_settings.USER_ID_CLAIM])
+        if user is None or not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        data['access'] = str(add_claims(access, user))
+        return data
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate_refresh(self, value):
+        try:
+            return CachedBlacklistRefreshToken(value)
+        except TokenError as e:
+            raise serializers.ValidationError(e.args[0])
+
 class UserSerializer(serializers.ModelSerializer):
+	avatar_derivatives = ImageDerivativesField(source='avatar')
+
 	class Meta:
 		model = UserModel
 		fields = '__all__'
 
 class ProductSerializer(serializers.ModelSerializer):
+    photos_derivatives = ImageDerivativesField(source='photos')
+    # Считается БД; строкой, как price
+    effective_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
     class Meta:
         model = Product
         fields = '__all__'
 
+    def save(self, **kwargs):
+        # Django 5.0 не перечитывает вычисляемые столбцы после save()
+        instance = super().save(**kwargs)
+        instance.refresh_from_db(fields=['effective_price'])
+        return instance
+
 class CategorySerializer(serializers.ModelSerializer):
+    image_derivatives = ImageDerivativesField(source='image')
+
     class Meta:
         model = Category
-        fields = ('id', 'name', 'description', 'image')
+        fields = ('id', 'name', 'description', 'image', 'image_derivatives')
         
+class ProductSummarySerializer(serializers.ModelSerializer):
+    photos_derivatives = ImageDerivativesField(source='photos')
+
+    class Meta:
+        model = Product
+        fields = ('id', 'name', 'price', 'discount', 'photos', 'photos_derivatives')
+
 class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = '__all__'
+        # Покупатель берётся из запроса, продавец и цена - из товара
+        read_only_fields = ('buyer', 'seller', 'unit_price')
+
+class OrderHistorySerializer(OrderSerializer):
+    product = ProductSummarySerializer(read_only=True)
+        
+class PhotoUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PhotoUpload
+        fields = ('id', 'product', 'size', 'offset')
+        read_only_fields = ('product', 'offset')
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.PHOTO_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'Размер файла от 1 до {settings.PHOTO_UPLOAD_MAX_SIZE} байт.')
+        return value
+
+class DailySalesSerializer(serializers.Serializer):
+    day = serializers.DateField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+class ProductSalesSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
         
 class CartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
         fields = ['id', 'product', 'quantity']
 
+class CartChangeSerializer(serializers.Serializer):
+    # Товар проверяется одним запросом на весь пакет в carts.apply_changes
+    product = serializers.IntegerField(min_value=1)
+    op = serializers.ChoiceField(choices=['set', 'increment', 'remove'], default='set')
+    quantity = serializers.IntegerField(min_value=0, max_value=10000, default=1)
+
+class CartBatchSerializer(serializers.Serializer):
+    items = CartChangeSerializer(many=True, allow_empty=False, max_length=500)
+
+class CartProductSerializer(ProductSummarySerializer):
+    class Meta(ProductSummarySerializer.Meta):
+        fields = ProductSummarySerializer.Meta.fields + ('quantity',)
+
+class CartLineSerializer(serializers.ModelSerializer):
+    # Товар целиком и суммы из carts.load_lines, без запросов на каждую строку
+    product = CartProductSerializer(read_only=True)
+    unit_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = CartItem
+        fields = ['id', 'product', 'quantity', 'unit_price', 'line_total']
+
 class CartSerializer(serializers.ModelSerializer):
-    items = CartItemSerializer(many=True, read_only=True)
+    items = CartLineSerializer(source='lines', many=True, read_only=True)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = Cart
-        fields = ['id', 'user', 'items']
\ No newline at end of file
+        fields = ['id', 'user', 'items', 'total']
\ No newline at end of file
@@ -0,0 +1,175 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from . import admission, authentication, autocomplete, broker, changes, images, search, snapshots, stats, versions
+from .models import AppUser, Category, Order, Product, products_created, products_updated
+
+# Поля товара, изменения которых рассылаются подписчикам
+PUSHED_FIELDS = ('quantity', 'price', 'discount')
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, **kwargs):
+    if search.is_available():
+        search.index_product(instance)
+
+
+@receiver(products_created, sender=Product)
+def index_created_products_for_search(sender, product_ids, **kwargs):
+    if search.is_available():
+        search.index_products(
+            Product.objects.filter(pk__in=product_ids).values_list('pk', 'name', 'description', 'composition')
+        )
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_for_search(sender, instance, **kwargs):
+    if search.is_available():
+        search.unindex_product(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def update_product_suggestions(sender, instance, **kwargs):
+    autocomplete.update_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_suggestions(sender, instance, **kwargs):
+    autocomplete.index.remove('product', instance.pk)
+
+
+@receiver(products_updated, sender=Product)
+@receiver(products_created, sender=Product)
+def refresh_product_suggestions(sender, product_ids, **kwargs):
+    autocomplete.refresh_products(product_ids)
+
+
+@receiver(post_save, sender=Category)
+def update_category_suggestions(sender, instance, **kwargs):
+    autocomplete.update_category(instance)
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_suggestions(sender, instance, **kwargs):
+    autocomplete.index.remove('category', instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def reset_flash_sale_gate(sender, instance, **kwargs):
+    if instance.is_flash_sale:
+        admission.gate.reset(instance.pk)
+    else:
+        # Распродажу сняли: арендованный остаток процесса возвращается в товар.
+        # Остальные процессы вернут свой при следующем обходе
+        product_id = instance.pk
+        transaction.on_commit(lambda: admission.gate.release(product_id))
+
+
+@receiver(post_save, sender=Order)
+def record_order_sales(sender, instance, created, **kwargs):
+    if created:
+        stats.record_orders([instance])
+
+
+@receiver(post_save, sender=Product)
+def schedule_product_photo_derivatives(sender, instance, **kwargs):
+    images.schedule(instance.photos)
+
+
+@receiver(post_save, sender=Category)
+def schedule_category_image_derivatives(sender, instance, **kwargs):
+    images.schedule(instance.image)
+
+
+@receiver(post_save, sender=AppUser)
+def schedule_avatar_derivatives(sender, instance, **kwargs):
+    images.schedule(instance.avatar)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_product_version(sender, **kwargs):
+    versions.bump('product')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_version(sender, **kwargs):
+    versions.bump('category')
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_state(sender, instance, **kwargs):
+    # Товар могли перенести в другую категорию: сбросим снимки обеих.
+    # Остаток и цена нужны, чтобы не рассылать события о правке описания
+    previous = (
+        Product.objects.filter(pk=instance.pk).values_list('category_id', *PUSHED_FIELDS).first()
+        if instance.pk else None
+    )
+    instance._previous_category_id = previous[0] if previous else None
+    instance._previous_pushed = previous
+
+
+def _invalidate_after_commit(*names):
+    # Снимок, собранный до коммита, содержит старые данные: сбрасываем после
+    # коммита, а сборку, начатую раньше, отбросит счётчик поколений
+    transaction.on_commit(lambda: snapshots.invalidate(*names))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_snapshots(sender, instance, **kwargs):
+    category_ids = {instance.category_id, getattr(instance, '_previous_category_id', None)} - {None}
+    _invalidate_after_commit(*[snapshots.category_products(category_id) for category_id in category_ids])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_snapshots(sender, instance, **kwargs):
+    _invalidate_after_commit(snapshots.CATEGORIES, snapshots.category_products(instance.pk))
+
+
+@receiver(products_updated, sender=Product)
+@receiver(products_created, sender=Product)
+def handle_bulk_product_update(sender, product_ids, category_ids, **kwargs):
+    versions.bump('product')
+    _invalidate_after_commit(*[snapshots.category_products(category_id) for category_id in category_ids])
+    changes.record(product_ids)
+
+
+def _push_after_commit(product_ids):
+    # Состояние читаем из БД после коммита: так в событии те же значения, что и в API
+    def publish():
+        rows = Product.objects.filter(pk__in=product_ids).values('id', 'category', *PUSHED_FIELDS)
+        broker.publish_products(list(rows))
+    transaction.on_commit(publish)
+
+
+@receiver(post_save, sender=Product)
+def push_product_state(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_pushed', None)
+    if previous != (instance.category_id, *[getattr(instance, field) for field in PUSHED_FIELDS]):
+        _push_after_commit([instance.pk])
+
+
+@receiver(products_updated, sender=Product)
+@receiver(products_created, sender=Product)
+def push_bulk_product_state(sender, product_ids, **kwargs):
+    _push_after_commit(product_ids)
+
+
+@receiver(post_save, sender=Product)
+def record_product_change(sender, instance, **kwargs):
+    changes.record([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def record_product_deletion(sender, instance, **kwargs):
+    changes.record([instance.pk], deleted=True)
+
+
+@receiver(post_save, sender=AppUser)
+@receiver(post_delete, sender=AppUser)
+def forget_cached_user(sender, instance, **kwargs):
+    authentication.forget_user(instance.pk)
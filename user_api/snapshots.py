@@ -0,0 +1,71 @@
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from . import versions
+
+CATEGORIES = 'categories'
+
+_state_lock = threading.Lock()
+_generations = defaultdict(int)
+_build_locks = defaultdict(threading.Lock)
+
+
+def category_products(category_id):
+    return f'products:category:{category_id}'
+
+
+class Snapshot:
+    """Готовый JSON ответа вместе с его ETag и Last-Modified."""
+
+    def __init__(self, content, etag, last_modified):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def response(self, request):
+        not_modified = versions.not_modified(request, self.etag, self.last_modified)
+        if not_modified is not None:
+            return not_modified
+        response = HttpResponse(self.content, content_type='application/json')
+        return versions.set_validators(response, self.etag, self.last_modified)
+
+
+def get(name, build):
+    cache = caches['snapshots']
+    snapshot = cache.get(name)
+    if snapshot is not None:
+        return snapshot
+    with _state_lock:
+        build_lock = _build_locks[name]
+    # Пересобирает только один поток, остальные ждут готовый снимок
+    with build_lock:
+        snapshot = cache.get(name)
+        if snapshot is not None:
+            return snapshot
+        generation = _generations[name]
+        snapshot = build()
+        with _state_lock:
+            # Снимок, собранный до инвалидации, в кэш не кладём
+            if _generations[name] == generation:
+                cache.set(name, snapshot)
+    return snapshot
+
+
+async def aget(name, build):
+    # Попадание в кэш в памяти отдаём прямо в event loop, сборку — в потоке
+    snapshot = caches['snapshots'].get(name)
+    if snapshot is not None:
+        return snapshot
+    return await sync_to_async(get)(name, build)
+
+
+def invalidate(*names):
+    cache = caches['snapshots']
+    with _state_lock:
+        for name in names:
+            _generations[name] += 1
+            cache.delete(name)
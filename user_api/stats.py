@@ -0,0 +1,60 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Order, SellerDailySales
+
+CENT = Decimal('0.01')
+
+
+def record_orders(orders):
+    """Добавляет новые заказы в дневные итоги продавцов одним запросом."""
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for order in orders:
+        key = (order.seller_id, order.product_id, timezone.localdate(order.date_time))
+        totals[key][0] += order.quantity
+        totals[key][1] += order.quantity * order.unit_price
+    if not totals:
+        return
+    table = connection.ops.quote_name(SellerDailySales._meta.db_table)
+    # Строку за день мог только что создать параллельный заказ: ON CONFLICT
+    # прибавляет к ней, а не падает на уникальном ключе
+    sql = (
+        f'INSERT INTO {table} (seller_id, product_id, day, units, revenue) VALUES (%s, %s, %s, %s, %s) '
+        f'ON CONFLICT (seller_id, product_id, day) DO UPDATE SET '
+        f'units = units + excluded.units, revenue = revenue + excluded.revenue'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (
+                seller_id, product_id, connection.ops.adapt_datefield_value(day), units,
+                connection.ops.adapt_decimalfield_value(revenue.quantize(CENT), 14, 2),
+            )
+            for (seller_id, product_id, day), (units, revenue) in totals.items()
+        ])
+
+
+def rebuild_rollups():
+    # Цена берётся из заказа: изменение цены товара не переписывает прошлую выручку
+    revenue = ExpressionWrapper(F('quantity') * F('unit_price'), output_field=DecimalField())
+    rows = (
+        Order.objects
+        .annotate(day=TruncDate('date_time'))
+        .values('seller_id', 'product_id', 'day')
+        .annotate(units=Sum('quantity'), revenue=Sum(revenue))
+        .order_by()
+    )
+    with transaction.atomic():
+        SellerDailySales.objects.all().delete()
+        created = SellerDailySales.objects.bulk_create(
+            (SellerDailySales(
+                seller_id=row['seller_id'], product_id=row['product_id'], day=row['day'],
+                units=row['units'], revenue=Decimal(row['revenue']).quantize(CENT),
+            ) for row in rows.iterator()),
+            batch_size=1000,
+        )
+    return len(created)
@@ -0,0 +1,42 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Имя файла - sha256 содержимого (у уменьшенных копий ещё и _<размер>)
+CONTENT_ADDRESSED_RE = re.compile(r'[0-9a-f]{64}(_\d+)?\.\w+$')
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED_RE.match(os.path.basename(name)))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под хэшем содержимого, одинаковые загрузки не дублируются."""
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        hexdigest = digest.hexdigest()
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, hexdigest[:2], hexdigest + extension).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+content_storage = ContentAddressedStorage()
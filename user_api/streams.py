@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import QueryDict
+
+from . import broker
+from .models import Product
+
+STREAM_PATH = '/products/stream/'
+MAX_TOPICS = 100
+
+
+def _parse_ids(query, name):
+    ids = set()
+    for value in query.getlist(name):
+        for part in value.split(','):
+            if not part.strip().isdigit():
+                raise ValueError(name)
+            ids.add(int(part))
+    return ids
+
+
+def _current_state(product_ids):
+    return list(
+        Product.objects.filter(pk__in=product_ids)
+        .values('id', 'category', 'quantity', 'price', 'discount').order_by('id')
+    )
+
+
+def _event(message):
+    return f'event: product\ndata: {json.dumps(message, cls=DjangoJSONEncoder)}\n\n'.encode()
+
+
+def _headers(scope, content_type):
+    headers = [(b'content-type', content_type)]
+    origin = dict(scope.get('headers', [])).get(b'origin', b'').decode('latin-1')
+    if origin in settings.CORS_ALLOWED_HOSTS:
+        headers += [
+            (b'access-control-allow-origin', origin.encode('latin-1')),
+            (b'access-control-allow-credentials', b'true'),
+        ]
+    return headers
+
+
+async def _reply(scope, send, status, payload):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': _headers(scope, b'application/json')})
+    await send({'type': 'http.response.body', 'body': json.dumps(payload, ensure_ascii=False).encode()})
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def product_stream(scope, receive, send):
+    """SSE-поток остатков и цен: GET /products/stream/?product=1,2&category=3.
+
+    Обслуживается в обход обработчика Django: тот держит на каждый запрос
+    свой поток для синхронного кода, а здесь соединение — только корутина
+    и очередь, поэтому тысячи простаивающих клиентов не занимают потоков.
+    """
+    if scope['method'] != 'GET':
+        await _reply(scope, send, 405, {'detail': 'Метод не поддерживается.'})
+        return
+    query = QueryDict(scope['query_string'])
+    try:
+        product_ids = _parse_ids(query, 'product')
+        category_ids = _parse_ids(query, 'category')
+    except ValueError as error:
+        await _reply(scope, send, 400, {str(error): ['Ожидается список id.']})
+        return
+    topics = [broker.product_topic(pk) for pk in product_ids] + [broker.category_topic(pk) for pk in category_ids]
+    if not topics or len(topics) > MAX_TOPICS:
+        await _reply(scope, send, 400, {'detail': f'Нужно от 1 до {MAX_TOPICS} товаров и категорий.'})
+        return
+    # Подписываемся до чтения текущего состояния, чтобы не пропустить изменения между ними
+    subscription = broker.broker.subscribe(topics)
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        current = await sync_to_async(_current_state, thread_sensitive=False)(product_ids) if product_ids else []
+        await send({'type': 'http.response.start', 'status': 200, 'headers': _headers(scope, b'text/event-stream') + [
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        body = b'retry: 3000\n\n' + b''.join(_event(row) for row in current)
+        while not disconnected.done():
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            message = asyncio.ensure_future(subscription.queue.get())
+            await asyncio.wait({message, disconnected}, timeout=settings.REALTIME_HEARTBEAT,
+                               return_when=asyncio.FIRST_COMPLETED)
+            if message.done():
+                body = _event(message.result())
+            else:
+                message.cancel()
+                # Комментарий не даёт прокси закрыть простаивающее соединение
+                body = b': ping\n\n'
+    finally:
+        disconnected.cancel()
+        broker.broker.unsubscribe(subscription)
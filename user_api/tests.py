@@ -1,3 +1,473 @@
-from django.test import TestCase
+import io
+import os
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from . import admission, autocomplete, bulk, carts, checkout, images, search, snapshots, uploads, versions
+from .filters import ProductFilter
+from .models import AppUser, CartItem, Category, FlashSaleLease, Order, PhotoUpload, Product, products_created, products_updated
+from .throttling import CatalogThrottle
+
+
+def create_catalog(products=3, quantity=10):
+    seller = AppUser.objects.create_user(email='seller@example.com', password='password123', username='seller')
+    category = Category.objects.create(name='Конфеты', description='')
+    Product.objects.bulk_create([
+        Product(
+            name=f'Товар {i}', quantity=quantity, weight=1.0, price=100 + i, discount=i,
+            manufacture_date=date(2026, 1, 1), expiry_date=date(2027, 1, 1),
+            seller=seller, category=category,
+        )
+        for i in range(products)
+    ])
+    return seller, category
+
+
+@skipUnless(connection.vendor == 'sqlite', 'план запроса в формате SQLite')
+class ProductFilterPlanTests(TestCase):
+    """Фильтры и сортировки ProductFilter обслуживаются индексами, без полного просмотра."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller, cls.category = create_catalog()
+
+    def plan(self, params):
+        filterset = ProductFilter(params, queryset=Product.objects.all())
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        return filterset.qs.explain()
+
+    def test_filters_use_index(self):
+        filters = {
+            'name': 'Товар 1', 'description': 'Описание', 'composition': 'Состав',
+            'discount': '1', 'quantity': '10', 'weight': '1.5', 'price': '101',
+            'manufacture_date': '2026-01-01', 'expiry_date': '2027-01-01',
+            'seller': str(self.seller.pk), 'category': str(self.category.pk),
+            'min_price': '100', 'max_price': '200',
+            'min_effective_price': '100', 'max_effective_price': '200',
+        }
+        for name, value in filters.items():
+            with self.subTest(filter=name):
+                plan = self.plan({name: value})
+                self.assertNotIn('SCAN user_api_product', plan)
+                self.assertIn('USING', plan)
+
+    def test_orderings_avoid_sort(self):
+        scopes = [{}, {'seller': str(self.seller.pk)}, {'category': str(self.category.pk)}]
+        for field in ProductFilter.base_filters['ordering'].param_map:
+            for ordering in (field, f'-{field}'):
+                for scope in scopes:
+                    with self.subTest(ordering=ordering, scope=scope):
+                        plan = self.plan({**scope, 'ordering': ordering})
+                        self.assertNotIn('TEMP B-TREE', plan)
+                        if scope:
+                            self.assertNotIn('SCAN user_api_product', plan)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'полнотекстовый поиск на FTS5')
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller, cls.category = create_catalog(products=0)
+        common = dict(
+            quantity=1, weight=1.0, price=100, manufacture_date=date(2026, 1, 1), expiry_date=date(2027, 1, 1),
+            seller=cls.seller, category=cls.category,
+        )
+        # Сохраняем по одному: индекс FTS обновляет сигнал post_save
+        cls.in_description = Product.objects.create(name='Печенье', description='С шоколадом', **common)
+        cls.in_name = Product.objects.create(name='Шоколад горький', **common)
+        Product.objects.create(name='Зефир', **common)
+
+    def test_name_match_ranks_first(self):
+        found = search.search_products(Product.objects.all(), 'шоколад')
+        self.assertEqual(list(found), [self.in_name, self.in_description])
+
+    def test_combines_with_filters(self):
+        found = search.search_products(Product.objects.filter(name__startswith='Печ'), 'шоколад')
+        self.assertEqual(list(found), [self.in_description])
+
+
+class AutocompleteRefreshTests(TestCase):
+    """Подсказки следуют за изменениями товаров в обход save()."""
+
+    def setUp(self):
+        self.seller, self.category = create_catalog(products=2)
+        patcher = mock.patch.object(autocomplete, 'index', autocomplete.PrefixIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ids(self, prefix):
+        return [item['id'] for item in autocomplete.index.suggest(prefix) if item['type'] == 'product']
+
+    def test_stock_change_reorders_suggestions(self):
+        first, second = Product.objects.order_by('pk')
+        # У второго скидка больше, он выше
+        self.assertEqual(self.ids('товар'), [second.pk, first.pk])
+        Product.objects.filter(pk=second.pk).update(quantity=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            products_updated.send(sender=Product, product_ids=[second.pk], category_ids=[self.category.pk])
+        self.assertEqual(self.ids('товар'), [first.pk, second.pk])
+
+    def test_large_import_rebuilds_index(self):
+        self.ids('товар')
+        created = Product.objects.bulk_create([
+            Product(
+                name=f'Зефир {i}', quantity=1, weight=1.0, price=100, manufacture_date=date(2026, 1, 1),
+                expiry_date=date(2027, 1, 1), seller=self.seller, category=self.category,
+            )
+            for i in range(autocomplete.REBUILD_THRESHOLD + 1)
+        ])
+        # Перестройка идёт в фоновом потоке; здесь вызываем её напрямую
+        with mock.patch.object(autocomplete.threading, 'Thread') as thread:
+            with self.captureOnCommitCallbacks(execute=True):
+                products_created.send(
+                    sender=Product, product_ids=[product.pk for product in created], category_ids=[self.category.pk],
+                )
+        thread.assert_called_once()
+        self.assertEqual(self.ids('зефир'), [])
+        autocomplete.index.rebuild()
+        self.assertEqual(len(autocomplete.index.suggest('зефир')), 10)
+
+
+class CheckoutTests(TransactionTestCase):
+    """Оформление корзины: число запросов и остатки при параллельных заказах."""
+
+    # Постоянное число запросов: транзакция, блокировка корзины и товаров, списание,
+    # версия и журнал изменений, заказы, итоги продавцов, очистка корзины, рассылка
+    CHECKOUT_QUERIES = 19
+
+    def setUp(self):
+        self.seller, self.category = create_catalog(products=5, quantity=5)
+        self.products = list(Product.objects.order_by('pk'))
+        # Строка версии каталога создаётся один раз при первом изменении
+        versions.bump('product')
+
+    def buyer(self, number, products, quantity=1):
+        buyer = AppUser.objects.create_user(
+            email=f'buyer{number}@example.com', password='password123', username=f'buyer{number}',
+        )
+        carts.apply_changes(carts.get_cart(buyer.pk), [
+            {'product': product.pk, 'op': 'increment', 'quantity': quantity} for product in products
+        ])
+        return buyer
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        for count in (1, len(self.products)):
+            with self.subTest(items=count):
+                buyer = self.buyer(count, self.products[:count])
+                with self.assertNumQueries(self.CHECKOUT_QUERIES):
+                    orders = checkout.checkout_cart(buyer)
+                self.assertEqual(len(orders), count)
+
+    def test_concurrent_checkouts_do_not_oversell(self):
+        product = self.products[0]
+        buyers = [self.buyer(number, [product]) for number in range(2 * product.quantity)]
+        start = threading.Barrier(len(buyers))
+        results = []
+
+        def place(buyer):
+            try:
+                start.wait()
+                checkout.checkout_cart(buyer)
+                results.append('ok')
+            except checkout.InsufficientStock:
+                results.append('short')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=place, args=(buyer,)) for buyer in buyers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count('ok'), product.quantity)
+        self.assertEqual(results.count('short'), len(buyers) - product.quantity)
+        self.assertEqual(Order.objects.filter(product=product).count(), product.quantity)
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 0)
+
+
+    def test_order_uses_product_read_in_transaction(self):
+        buyer = self.buyer(0, [])
+        stale = self.products[0]
+        Product.objects.filter(pk=stale.pk).update(price=200, discount=0)
+        order = checkout.create_order(buyer, stale, 2)
+        self.assertEqual(order.unit_price, Decimal('200.00'))
+        self.assertEqual(Product.objects.values_list('quantity', flat=True).get(pk=stale.pk), stale.quantity - 2)
+
+class CartQueryTests(TestCase):
+    """Число запросов корзины не растёт с числом позиций."""
+
+    # Корзина, проверка товаров, текущие количества, upsert, позиции;
+    # в TestCase транзакция apply_changes — ещё SAVEPOINT и RELEASE
+    BATCH_QUERIES = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller, cls.category = create_catalog(products=50)
+        cls.products = list(Product.objects.order_by('pk'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def test_cart_with_50_items_in_two_queries(self):
+        carts.apply_changes(carts.get_cart(self.seller.pk), [
+            {'product': product.pk, 'op': 'increment', 'quantity': 1} for product in self.products
+        ])
+        # Корзина, затем позиции вместе с товарами и суммами — без запроса на позицию
+        with self.assertNumQueries(2):
+            response = self.client.get('/cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['items']), 50)
+
+    def test_batch_query_count_does_not_depend_on_batch_size(self):
+        cart = carts.get_cart(self.seller.pk)
+        for count in (1, len(self.products)):
+            with self.subTest(items=count):
+                # Половина позиций уже в корзине: пакет и обновляет, и добавляет строки
+                CartItem.objects.filter(cart=cart).delete()
+                carts.apply_changes(cart, [
+                    {'product': product.pk, 'op': 'set', 'quantity': 1} for product in self.products[:count:2]
+                ])
+                items = [{'product': product.pk, 'op': 'increment', 'quantity': 2} for product in self.products[:count]]
+                with self.assertNumQueries(self.BATCH_QUERIES):
+                    response = self.client.patch('/cart/items/', {'items': items}, format='json')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['items']), count)
+
+class OrderHistoryQueryTests(TestCase):
+    """История заказов читается одним запросом на страницу, без запроса на заказ."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller, cls.category = create_catalog(products=5)
+        products = list(Product.objects.order_by('pk'))
+        cls.buyers = []
+        for count in (1, 10):
+            buyer = AppUser.objects.create_user(
+                email=f'buyer{count}@example.com', password='password123', username=f'buyer{count}',
+            )
+            Order.objects.bulk_create([
+                Order(
+                    buyer=buyer, seller=cls.seller, product=products[i % 5],
+                    quantity=1, unit_price=products[i % 5].effective_price,
+                )
+                for i in range(count)
+            ])
+            cls.buyers.append((count, buyer))
+
+    def test_query_count_does_not_depend_on_order_count(self):
+        client = APIClient()
+        for count, buyer in self.buyers:
+            with self.subTest(orders=count):
+                client.force_authenticate(buyer)
+                with self.assertNumQueries(1):
+                    response = client.get('/orders/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), count)
+
+class FlashSaleGateTests(TestCase):
+    """Арендованный остаток флеш-распродажи возвращается в товар."""
+
+    def setUp(self):
+        self.seller, self.category = create_catalog(products=1, quantity=100)
+        Product.objects.update(is_flash_sale=True)
+        self.product = Product.objects.get()
+        self.buyer = AppUser.objects.create_user(email='buyer@example.com', password='password123', username='buyer')
+        self.gate = admission.FlashSaleGate(batch_size=50, sold_out_ttl=5, share=0.1, idle=60, ttl=30)
+        for patcher in (
+            mock.patch.object(admission, 'gate', self.gate),
+            # Обход вызываем в тесте сами
+            mock.patch.object(admission.FlashSaleGate, '_start_sweeper'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def quantity(self):
+        return Product.objects.values_list('quantity', flat=True).get()
+
+    def test_batch_capped_by_remaining_stock(self):
+        checkout.create_order(self.buyer, self.product, 1)
+        # Десятая часть остатка, а не вся партия в 50 штук
+        self.assertEqual(self.quantity(), 90)
+        self.assertEqual(FlashSaleLease.objects.get().quantity, 9)
+
+    def test_cleared_flash_sale_returns_lease(self):
+        checkout.create_order(self.buyer, self.product, 1)
+        self.product.refresh_from_db()
+        self.product.is_flash_sale = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertEqual(self.quantity(), 99)
+        self.assertFalse(FlashSaleLease.objects.exists())
+
+    def test_idle_lease_returned_by_sweep(self):
+        checkout.create_order(self.buyer, self.product, 1)
+        self.gate.idle = 0
+        self.gate.sweep()
+        self.assertEqual(self.quantity(), 99)
+        self.assertEqual(self.gate._leases, {})
+
+    def test_expired_lease_of_dead_process_reclaimed(self):
+        Product.objects.update(quantity=93)
+        FlashSaleLease.objects.create(
+            product=self.product, owner='host:1:dead', quantity=7, expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.gate.sweep()
+        self.assertEqual(self.quantity(), 100)
+        self.assertFalse(FlashSaleLease.objects.exists())
+
+
+class PhotoUploadConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.seller, self.category = create_catalog(products=1)
+        image = io.BytesIO()
+        Image.new('RGB', (64, 64), 'red').save(image, 'PNG')
+        self.data = image.getvalue()
+        # Вторая половина не отправляется: загрузка не завершится и не тронет MEDIA_ROOT
+        self.upload = PhotoUpload.objects.create(
+            product=Product.objects.get(), owner=self.seller, size=2 * len(self.data),
+        )
+        self.addCleanup(lambda: os.path.exists(uploads.part_path(self.upload)) and os.remove(uploads.part_path(self.upload)))
+
+    def test_same_offset_appended_once(self):
+        # Оба запроса прошли раннюю проверку смещения и приняли тело
+        both_received = threading.Barrier(2)
+        receive_chunk = uploads.receive_chunk
+
+        def receive_then_wait(*args):
+            chunk = receive_chunk(*args)
+            both_received.wait()
+            return chunk
+
+        statuses = []
+
+        def patch():
+            client = APIClient()
+            client.force_authenticate(self.seller)
+            response = client.generic(
+                'PATCH', f'/photo-uploads/{self.upload.pk}/', self.data,
+                content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET='0',
+            )
+            statuses.append(response.status_code)
+            connection.close()
+
+        with mock.patch.object(uploads, 'receive_chunk', receive_then_wait):
+            threads = [threading.Thread(target=patch) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(sorted(statuses), [200, 409])
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.offset, len(self.data))
+        with open(uploads.part_path(self.upload), 'rb') as part:
+            self.assertEqual(part.read(), self.data)
+
+
+class ConditionalGetTests(TestCase):
+    """Ответ 304 стоит одного запроса к БД: версию каталога или время изменения товара."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        # Строка версии появляется при первом изменении каталога
+        versions.bump('product')
+        cls.product = Product.objects.first()
+
+    def assert_not_modified_in_one_query(self, url):
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_product_list(self):
+        self.assert_not_modified_in_one_query('/products/?ordering=price')
+
+    def test_product_detail(self):
+        self.assert_not_modified_in_one_query(f'/products/{self.product.pk}/')
+
+
+class SnapshotInvalidationTests(TransactionTestCase):
+    def setUp(self):
+        caches['snapshots'].clear()
+
+    def test_snapshot_built_before_commit_is_dropped(self):
+        seller, category = create_catalog(products=1)
+        name = snapshots.category_products(category.pk)
+        with transaction.atomic():
+            Product.objects.update(price=500)
+            products_updated.send(
+                sender=Product, product_ids=list(Product.objects.values_list('pk', flat=True)),
+                category_ids=[category.pk],
+            )
+            # Параллельный запрос собирает снимок, пока изменение не закоммичено
+            snapshots.get(name, lambda: 'до коммита')
+        self.assertEqual(snapshots.get(name, lambda: 'после коммита'), 'после коммита')
+
+
+@override_settings(ROOT_URLCONF='backend.asgi_urls')
+class AsyncProductListTests(TestCase):
+    async def test_unknown_category_is_bad_request(self):
+        response = await self.async_client.get('/products/', {'category': '9999'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('category', response.json())
+
+    async def test_paginated_request_charged_once(self):
+        with mock.patch.object(CatalogThrottle, 'allow', return_value=True) as allow:
+            response = await self.async_client.get('/products/', {'page_size': '10'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(allow.call_count, 1)
+
+
+class CartPriceTests(TestCase):
+    def test_cart_uses_catalog_effective_price(self):
+        seller, category = create_catalog(products=1)
+        Product.objects.update(price='0.50', discount=75)
+        product = Product.objects.get()
+        cart = carts.get_cart(seller.pk)
+        carts.apply_changes(cart, [{'product': product.pk, 'op': 'increment', 'quantity': 2}])
+        line, = carts.load_lines(cart).lines
+        # 0.125 округляется одинаково в каталоге и в корзине
+        self.assertEqual(product.effective_price, Decimal('0.13'))
+        self.assertEqual(line.unit_price, product.effective_price)
+        self.assertEqual(cart.total, Decimal('0.26'))
+
+
+class DerivativeUrlsTests(TestCase):
+    """Ссылки на копии изображения не проверяют хранилище на каждый ответ."""
+
+    def setUp(self):
+        caches['image_derivatives'].clear()
+
+    def test_storage_checked_once_until_copies_rendered(self):
+        name = 'product_photos/photo.jpg'
+        with mock.patch.object(images.default_storage, 'exists', return_value=False) as exists:
+            for _ in range(3):
+                self.assertEqual(images.derivative_urls(name)['256']['webp'], '/media/product_photos/photo.jpg')
+            self.assertEqual(exists.call_count, len(images.SIZES) * len(images.FORMATS))
+            # Копии созданы: запись сбрасывается, ссылки ведут на них
+            exists.return_value = True
+            images.forget(name)
+            self.assertEqual(images.derivative_urls(name)['256']['webp'], '/media/derivatives/product_photos/photo_256.webp')
+            images.derivative_urls(name)
+            self.assertEqual(exists.call_count, 2 * len(images.SIZES) * len(images.FORMATS))
+
+class ProductImportTests(TestCase):
+    def test_text_fields_limited_like_api(self):
+        seller, category = create_catalog(products=0)
+        header = 'name,description,composition,quantity,weight,price,manufacture_date,expiry_date,category\n'
+        row = 'Зефир,{},{},1,1.0,100,2026-01-01,2027-01-01,%d\n' % category.pk
+        stream = io.BytesIO((header + row.format('о' * 800, 'с' * 400) + row.format('о' * 801, 'с' * 401)).encode())
+        report = bulk.import_products(stream, 'csv', seller.pk)
+        self.assertEqual((report.created, report.failed), (1, 1))
+        self.assertEqual(set(report.errors[0]['errors']), {'description', 'composition'})
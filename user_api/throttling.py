@@ -0,0 +1,147 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+try:
+    import fcntl
+except ImportError:  # Windows: только один процесс
+    fcntl = None
+
+
+class SharedBucketStore:
+    """Корзины токенов в файле, отображённом в память всеми процессами.
+
+    Таблица фиксированного размера с открытой адресацией: слот — хеш ключа,
+    число токенов и время обновления. Изменение защищено flock на файл,
+    поэтому проверка стоит микросекунды и не требует внешнего сервиса.
+    Если все слоты окна проб заняты, вытесняется давно не обновлявшийся.
+    """
+
+    SLOT = struct.Struct('<Qdd')
+    PROBES = 8
+
+    def __init__(self, path, slots):
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+
+    def _open(self):
+        # После fork нужен свой дескриптор, иначе flock не разделяет процессы
+        if self._pid == os.getpid():
+            return
+        size = self.slots * self.SLOT.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd, self._map, self._pid = fd, mmap.mmap(fd, size), os.getpid()
+
+    @staticmethod
+    def key_hash(key):
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+    def take(self, key, capacity, refill_rate):
+        """Забирает токен; возвращает 0 или сколько секунд ждать следующего."""
+        key_hash = self.key_hash(key)
+        with self._lock:
+            self._open()
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                return self._take(key_hash, capacity, refill_rate, time.time())
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _take(self, key_hash, capacity, refill_rate, now):
+        start = key_hash % self.slots
+        victim = None
+        for probe in range(self.PROBES):
+            offset = (start + probe) % self.slots * self.SLOT.size
+            slot_key, tokens, updated = self.SLOT.unpack_from(self._map, offset)
+            if slot_key == key_hash:
+                # Часы могли уйти назад, отрицательное пополнение не нужно
+                tokens = min(capacity, tokens + max(now - updated, 0) * refill_rate)
+                break
+            if victim is None or slot_key == 0 or updated < victim[1]:
+                victim = (offset, 0 if slot_key == 0 else updated)
+        else:
+            offset, tokens = victim[0], capacity
+        if tokens >= 1:
+            self.SLOT.pack_into(self._map, offset, key_hash, tokens - 1, now)
+            return 0
+        self.SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+        return (1 - tokens) / refill_rate
+
+
+store = SharedBucketStore(settings.THROTTLE_STORE_PATH, settings.THROTTLE_STORE_SLOTS)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Корзина токенов на пользователя, для анонимов — на IP.
+
+    Скорость задаётся в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][scope]
+    в формате DRF: '100/min' — корзина на 100 запросов, пополняемая
+    со скоростью 100 в минуту.
+    """
+
+    scope = None
+    methods = None
+    durations = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+    def __init__(self):
+        num, period = api_settings.DEFAULT_THROTTLE_RATES[self.scope].split('/')
+        self.capacity = int(num)
+        self.refill_rate = self.capacity / self.durations[period[0]]
+        self._wait = 0
+
+    def get_cache_key(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'{self.scope}:user:{user.pk}'
+        return f'{self.scope}:ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        if self.methods is not None and request.method not in self.methods:
+            return True
+        return self.allow(self.get_cache_key(request))
+
+    def allow(self, key):
+        self._wait = store.take(key, self.capacity, self.refill_rate)
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class AuthThrottle(TokenBucketThrottle):
+    # Вход, регистрация, обновление токена
+    scope = 'auth'
+
+
+class CatalogThrottle(TokenBucketThrottle):
+    # Чтение: товары, категории, поиск, корзина и заказы на GET
+    scope = 'catalog'
+    methods = ('GET', 'HEAD', 'OPTIONS')
+
+
+class WriteThrottle(TokenBucketThrottle):
+    # Изменения: корзина, заказы, товары, загрузки
+    scope = 'writes'
+    methods = ('POST', 'PUT', 'PATCH', 'DELETE')
@@ -0,0 +1,77 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class RevokedTokens:
+    """JTI отозванных и ещё не истёкших refresh-токенов в памяти процесса.
+
+    Проверка не ходит в БД: раз в sync_interval секунд процесс дочитывает
+    строки BlacklistedToken, добавленные другими процессами. Свои отзывы
+    видны сразу.
+    """
+
+    # Запас на расхождение часов серверов при дочитывании
+    CLOCK_SKEW = timedelta(seconds=60)
+
+    def __init__(self, sync_interval):
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._expires = {}
+        self._synced_at = None
+        self._synced_since = None
+
+    def __contains__(self, jti):
+        self._sync()
+        return jti in self._expires
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._expires[jti] = expires_at
+
+    def reset(self):
+        with self._lock:
+            self._expires.clear()
+            self._synced_at = self._synced_since = None
+
+    def _sync(self):
+        if self._synced_at is not None and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if self._synced_at is not None and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            now = timezone.now()
+            rows = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+            if self._synced_since is not None:
+                rows = rows.filter(blacklisted_at__gte=self._synced_since - self.CLOCK_SKEW)
+            for jti, expires_at in rows.values_list('token__jti', 'token__expires_at'):
+                self._expires[jti] = expires_at.timestamp()
+            # Истёкшие токены не пройдут проверку exp, хранить их незачем
+            for jti in [jti for jti, expires_at in self._expires.items() if expires_at <= now.timestamp()]:
+                del self._expires[jti]
+            self._synced_since = now
+            self._synced_at = time.monotonic()
+
+
+revoked = RevokedTokens(settings.REVOKED_TOKENS_SYNC_INTERVAL)
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """Refresh-токен, отзыв которого проверяется по множеству в памяти."""
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in revoked:
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        result = super().blacklist()
+        revoked.add(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return result
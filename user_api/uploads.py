@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image, ImageFile
+
+# Заголовок изображения должен найтись в первых байтах файла
+HEADER_LIMIT = 256 * 1024
+FEED_SIZE = 4096
+
+
+class UploadError(Exception):
+    pass
+
+
+def part_path(upload):
+    return os.path.join(settings.PHOTO_UPLOAD_TEMP_DIR, f'{upload.pk}.part')
+
+
+def detect_format(path):
+    """Разбирает только заголовок изображения, не декодируя пиксели."""
+    parser = ImageFile.Parser()
+    with open(path, 'rb') as file:
+        while file.tell() < HEADER_LIMIT:
+            data = file.read(FEED_SIZE)
+            if not data:
+                return None
+            try:
+                parser.feed(data)
+            except (OSError, SyntaxError):
+                raise UploadError('Файл не является изображением')
+            if parser.image is not None:
+                return parser.image.format
+    raise UploadError('Файл не является изображением')
+
+
+def receive_chunk(upload, stream, length):
+    """Читает часть из потока запроса во временный файл, в памяти не больше одного куска.
+
+    Чтение из сети идёт без блокировок; в файл загрузки часть попадает в append_chunk.
+    """
+    os.makedirs(settings.PHOTO_UPLOAD_TEMP_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=settings.PHOTO_UPLOAD_TEMP_DIR, prefix=f'{upload.pk}.', suffix='.chunk', delete=False,
+    ) as file:
+        remaining = length
+        while remaining > 0:
+            data = stream.read(min(FEED_SIZE * 16, remaining))
+            if not data:
+                break
+            file.write(data)
+            remaining -= len(data)
+    return file.name
+
+
+def append_chunk(upload, chunk_path):
+    """Дописывает принятую часть в файл загрузки. Строка загрузки должна быть заблокирована."""
+    path = part_path(upload)
+    with open(path, 'ab') as file, open(chunk_path, 'rb') as chunk:
+        if file.tell() != upload.offset:
+            file.truncate(upload.offset)
+        shutil.copyfileobj(chunk, file)
+        written = file.tell() - upload.offset
+    upload.offset += written
+    if not upload.format:
+        upload.format = detect_format(path) or ''
+        if not upload.format and upload.offset >= min(upload.size, HEADER_LIMIT):
+            raise UploadError('Файл не является изображением')
+    return written
+
+
+def finish(upload):
+    path = part_path(upload)
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        raise UploadError('Изображение повреждено')
+    with open(path, 'rb') as file:
+        upload.product.photos.save(f'upload.{upload.format.lower()}', File(file), save=True)
+    discard(upload)
+
+
+def discard(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
@@ -0,0 +1,46 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import TableVersion
+
+
+def bump(table):
+    with transaction.atomic():
+        if TableVersion.objects.filter(pk=table).update(version=F('version') + 1, updated_at=timezone.now()):
+            return
+        try:
+            with transaction.atomic():
+                TableVersion.objects.create(table=table, version=1)
+        except IntegrityError:
+            TableVersion.objects.filter(pk=table).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def current(table):
+    """Версия таблицы и время последнего изменения одним запросом по первичному ключу."""
+    return TableVersion.objects.filter(pk=table).values_list('version', 'updated_at').first() or (0, None)
+
+
+async def acurrent(table):
+    return await TableVersion.objects.filter(pk=table).values_list('version', 'updated_at').afirst() or (0, None)
+
+
+def not_modified(request, etag, last_modified=None):
+    # 304, если у клиента актуальная копия; иначе None
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        return set_validators(response, etag, last_modified)
+    return None
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -1,26 +1,49 @@
+import mimetypes
+import os
+import re
+from datetime import date, timedelta
+
+from django.conf import settings
 from django.contrib.auth import logout
-from rest_framework.authentication import SessionAuthentication, BasicAuthentication
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from .serializers import UserRegisterSerializer, UserLoginSerializer, UserSerializer
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import F, Sum
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
 from rest_framework import permissions, status
-from .validations import custom_validation
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
 from rest_framework.generics import ListAPIView, RetrieveUpdateAPIView
-from rest_framework import status
-from .models import Category, Product, Order, Cart, CartItem
-from .serializers import CategorySerializer, ProductSerializer, OrderSerializer, CartSerializer, CartItemSerializer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
-from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import autocomplete, bulk, carts, changes, facets, hashing, snapshots, uploads, versions
+from .admission import gate
+from .authentication import ClaimsJWTAuthentication
+from .checkout import EmptyCart, InsufficientStock, checkout_cart, create_order
 from .filters import ProductFilter
-from django_filters.rest_framework import DjangoFilterBackend
+from .models import AppUser, CartItem, Category, Order, PhotoUpload, Product, SellerDailySales
+from .pagination import OrderCursorPagination, ProductCursorPagination, ProductSearchPagination
+from .search import search_products
+from .serializers import (
+    CartBatchSerializer, CartItemSerializer, CartSerializer, CategorySerializer, ClaimsTokenObtainPairSerializer,
+    DailySalesSerializer, LogoutSerializer, OrderHistorySerializer, OrderSerializer, PhotoUploadSerializer,
+    ProductSalesSerializer, ProductSerializer, UserLoginSerializer, UserRegisterSerializer, UserSerializer,
+)
+from .storage import is_content_addressed
+from .throttling import AuthThrottle
+from .validations import custom_validation
 
 
 
 class UserRegister(APIView):
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (AuthThrottle,)
 
     def post(self, request):
         clean_data = custom_validation(request.data)
@@ -29,7 +52,7 @@ class UserRegister(APIView):
             user = serializer.save()  # метод save сериализатора
             if user:
                 # Создаем токены JWT для пользователя
-                refresh = RefreshToken.for_user(user)
+                refresh = ClaimsTokenObtainPairSerializer.get_token(user)
                 return Response({
                     'refresh': str(refresh),
                     'access': str(refresh.access_token),
@@ -39,6 +62,7 @@ class UserRegister(APIView):
 
 class UserLogin(TokenObtainPairView):
     permission_classes = (permissions.AllowAny,)
+    throttle_classes = (AuthThrottle,)
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -52,44 +76,63 @@ class UserLogin(TokenObtainPairView):
 
     @classmethod
     def get_serializer_class(cls):
-        return TokenObtainPairSerializer
+        return ClaimsTokenObtainPairSerializer
 
 class UserLogout(APIView):
     permission_classes = (permissions.AllowAny,)
-    authentication_classes = (JWTAuthentication,)
+    throttle_classes = (AuthThrottle,)
+    authentication_classes = (ClaimsJWTAuthentication,)
     
     def post(self, request):
+        # Отзываем refresh-токен, иначе по нему можно получать новые access-токены
+        serializer = LogoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.validated_data['refresh'].blacklist()
         logout(request)
         return Response(status=status.HTTP_200_OK)
 
 
 class UserView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (ClaimsJWTAuthentication,)
 
     def get(self, request):
         # Получение данных профиля пользователя
-        serializer = UserSerializer(request.user)
+        if request.user.instance is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        serializer = UserSerializer(request.user.instance)
         return Response({'user': serializer.data}, status=status.HTTP_200_OK)
 
     def patch(self, request):
-        # Частичное обновление данных профиля пользователя
-        serializer = UserSerializer(request.user, data=request.data, partial=True)
+        # Частичное обновление данных профиля пользователя, строку берём из БД, а не из кэша
+        user = AppUser.objects.filter(pk=request.user.pk).first()
+        if user is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        serializer = UserSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response({'user': serializer.data}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class PasswordHashingMetricsView(APIView):
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        # Очередь и время хеширования паролей в этом процессе
+        return Response(hashing.pool.metrics())
+
+
 class ProductListCreateAPIView(APIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProductFilter
+    pagination_class = ProductCursorPagination
     
     def get_permissions(self):
         if self.request.method == 'POST':
-            self.authentication_classes = [JWTAuthentication,]
+            self.authentication_classes = [ClaimsJWTAuthentication,]
             self.permission_classes = [permissions.IsAuthenticated,]
         else:
             self.authentication_classes = []
@@ -97,9 +140,41 @@ class ProductListCreateAPIView(APIView):
         return [permission() for permission in self.permission_classes]
 
     def get(self, request, *args, **kwargs):
-        filtered_queryset = self.filterset_class(self.request.GET, queryset=self.queryset).qs
-        serializer = self.serializer_class(filtered_queryset, many=True)
-        return Response(serializer.data)
+        # Список товаров одной категории отдаём из готового снимка
+        category_id = request.GET.get('category', '')
+        if list(request.GET) == ['category'] and category_id.isdigit():
+            snapshot = snapshots.get(
+                snapshots.category_products(int(category_id)),
+                lambda: self.build_snapshot(request),
+            )
+            return snapshot.response(request)
+        # Клиенту с актуальной копией каталога отвечаем 304, ничего не сериализуя
+        version, changed_at = versions.current('product')
+        etag = f'"products-{version}"'
+        not_modified = versions.not_modified(request, etag, changed_at)
+        if not_modified is not None:
+            return not_modified
+        filterset = self.filterset_class(self.request.GET, queryset=self.queryset)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        filtered_queryset = filterset.qs
+        paginator = self.pagination_class()
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(filtered_queryset, request, view=self)
+            serializer = self.serializer_class(page, many=True)
+            response = paginator.get_paginated_response(serializer.data)
+        else:
+            serializer = self.serializer_class(filtered_queryset, many=True)
+            response = Response(serializer.data)
+        return versions.set_validators(response, etag, changed_at)
+
+    def build_snapshot(self, request):
+        version, changed_at = versions.current('product')
+        filterset = self.filterset_class(request.GET, queryset=self.queryset)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        serializer = self.serializer_class(filterset.qs, many=True)
+        return snapshots.Snapshot(JSONRenderer().render(serializer.data), f'"products-{version}"', changed_at)
 
     def post(self, request):
         # Доступ только аутентифицированным пользователям
@@ -110,13 +185,130 @@ class ProductListCreateAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ProductFacetsAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    filterset_class = ProductFilter
+
+    def get(self, request):
+        # Счётчики для боковой панели каталога с теми же фильтрами, что у списка
+        filterset = self.filterset_class(request.GET, queryset=Product.objects.all())
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        version, changed_at = versions.current('product')
+        key = facets.filter_key(filterset.form.cleaned_data)
+        etag = f'"facets-{version}-{key}"'
+        not_modified = versions.not_modified(request, etag, changed_at)
+        if not_modified is not None:
+            return not_modified
+        result = facets.get(version, key, lambda: facets.compute(filterset.qs))
+        return versions.set_validators(Response(result), etag, changed_at)
+
+
+class ProductImportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication]
+
+    def post(self, request):
+        # Тело запроса — сам файл (text/csv или application/x-ndjson), читается
+        # построчно, без загрузки целиком; товары создаются от имени продавца
+        fmt = bulk.format_for(request.query_params.get('type') or request.content_type, default=None)
+        if fmt is None:
+            return Response({'detail': 'Ожидается text/csv или application/x-ndjson.'}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        report = bulk.import_products(request.stream or [], fmt, request.user.pk)
+        return Response(report.as_dict(), status=status.HTTP_201_CREATED if report.created else status.HTTP_400_BAD_REQUEST)
+
+
+class ProductExportView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    filterset_class = ProductFilter
+
+    def get(self, request):
+        # ?type=csv|ndjson и те же фильтры, что у списка; ответ отдаётся по мере чтения БД
+        fmt = request.query_params.get('type', 'csv')
+        if fmt not in bulk.FORMATS:
+            return Response({'type': [f'Допустимые значения: {", ".join(bulk.FORMATS)}.']}, status=status.HTTP_400_BAD_REQUEST)
+        filterset = self.filterset_class(request.GET, queryset=Product.objects.all())
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        content_type = 'text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson; charset=utf-8'
+        response = StreamingHttpResponse(bulk.export_rows(filterset.qs, fmt), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="products.{fmt}"'
+        return response
+
+
+class ProductSearchAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    filterset_class = ProductFilter
+    pagination_class = ProductSearchPagination
+
+    def get(self, request):
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            return Response({'q': ['Обязательный параметр.']}, status=status.HTTP_400_BAD_REQUEST)
+        # Фильтры ProductFilter (цена, категория и т.д.) сужают результаты поиска
+        filterset = self.filterset_class(request.GET, queryset=Product.objects.all())
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        queryset = search_products(filterset.qs, q)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = ProductSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class ProductAutocompleteAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), autocomplete.MAX_SUGGESTIONS)
+        except ValueError:
+            return Response({'limit': ['Ожидается целое число.']}, status=status.HTTP_400_BAD_REQUEST)
+        suggestions = autocomplete.index.suggest(request.query_params.get('q', ''), max(limit, 1))
+        return Response(suggestions)
+
+
+class ProductChangesAPIView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    page_size = 500
+    max_page_size = 2000
+
+    def get(self, request):
+        # Токен — seq последнего полученного изменения, пустой токен означает весь каталог
+        since = request.query_params.get('since', '') or '0'
+        if not since.isdigit():
+            return Response({'since': ['Недействительный токен.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', self.page_size)), self.max_page_size)
+        except ValueError:
+            return Response({'limit': ['Ожидается целое число.']}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(limit, 1)
+        # Лишняя строка показывает, остались ли изменения после этой страницы
+        rows = changes.since(int(since), limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        updated_ids = [row.product_id for row in rows if not row.deleted]
+        products = Product.objects.filter(pk__in=updated_ids).order_by('pk') if updated_ids else []
+        return Response({
+            'updated': ProductSerializer(products, many=True).data,
+            'deleted': [row.product_id for row in rows if row.deleted],
+            'next': str(rows[-1].seq) if rows else since,
+            'has_more': has_more,
+        })
+
+
 class ProductDetailAPIView(RetrieveUpdateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
     def get_permissions(self):
         if self.request.method == 'PATCH':
-            self.authentication_classes = [JWTAuthentication,]
+            self.authentication_classes = [ClaimsJWTAuthentication,]
             self.permission_classes = [permissions.IsAuthenticated,]
         else:
             self.authentication_classes = []
@@ -127,6 +319,16 @@ class ProductDetailAPIView(RetrieveUpdateAPIView):
         pk = self.kwargs.get('pk')
         return Product.objects.get(pk=pk)
 
+    def get(self, request, *args, **kwargs):
+        changed_at = Product.objects.filter(pk=kwargs['pk']).values_list('updated_at', flat=True).first()
+        if changed_at is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        etag = f'"product-{kwargs["pk"]}-{int(changed_at.timestamp() * 1000000)}"'
+        not_modified = versions.not_modified(request, etag, changed_at)
+        if not_modified is not None:
+            return not_modified
+        return versions.set_validators(super().get(request, *args, **kwargs), etag, changed_at)
+
     def patch(self, request, *args, **kwargs):
         product = self.get_object()
         serializer = ProductSerializer(product, data=request.data, partial=True)
@@ -135,25 +337,152 @@ class ProductDetailAPIView(RetrieveUpdateAPIView):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class PhotoUploadCreateView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    authentication_classes = (ClaimsJWTAuthentication,)
+
+    def post(self, request, pk):
+        # Начинаем загрузку фотографии товара частями, размер файла известен заранее
+        try:
+            product = Product.objects.get(pk=pk, seller_id=request.user.pk)
+        except Product.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        serializer = PhotoUploadSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(product=product, owner_id=request.user.pk)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class PhotoUploadView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    authentication_classes = (ClaimsJWTAuthentication,)
+
+    def get_object(self, upload_id):
+        return PhotoUpload.objects.select_related('product').get(pk=upload_id, owner_id=self.request.user.pk)
+
+    def get(self, request, upload_id):
+        # Сколько байт уже получено - с этого места клиент продолжает загрузку
+        try:
+            upload = self.get_object(upload_id)
+        except PhotoUpload.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(PhotoUploadSerializer(upload).data)
+
+    def patch(self, request, upload_id):
+        # Тело запроса - очередная часть файла, Upload-Offset - её смещение
+        try:
+            upload = self.get_object(upload_id)
+        except PhotoUpload.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return Response({'detail': 'Нужны заголовки Upload-Offset и Content-Length'}, status=status.HTTP_400_BAD_REQUEST)
+        if offset != upload.offset:
+            return Response(PhotoUploadSerializer(upload).data, status=status.HTTP_409_CONFLICT)
+        if length > settings.PHOTO_UPLOAD_CHUNK_SIZE or offset + length > upload.size:
+            return Response({'detail': 'Слишком большая часть'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        chunk = uploads.receive_chunk(upload, request.stream, length)
+        try:
+            with transaction.atomic():
+                # Занимаем смещение условной записью: в SQLite она же берёт блокировку
+                # на запись, select_for_update там ничего не блокирует. Параллельный
+                # PATCH с тем же Upload-Offset обновит 0 строк и получит 409
+                if not PhotoUpload.objects.filter(pk=upload.pk, offset=offset).update(offset=F('offset')):
+                    upload.refresh_from_db(fields=['offset'])
+                    return Response(PhotoUploadSerializer(upload).data, status=status.HTTP_409_CONFLICT)
+                upload = PhotoUpload.objects.select_for_update().select_related('product').get(pk=upload.pk)
+                uploads.append_chunk(upload, chunk)
+                upload.save(update_fields=['offset', 'format'])
+            if upload.offset < upload.size:
+                return Response(PhotoUploadSerializer(upload).data)
+            uploads.finish(upload)
+        except uploads.UploadError as e:
+            uploads.discard(upload)
+            return Response({'detail': str(e)}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        finally:
+            os.remove(chunk)
+        return Response(ProductSerializer(upload.product).data)
+
+    def delete(self, request, upload_id):
+        try:
+            upload = self.get_object(upload_id)
+        except PhotoUpload.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        uploads.discard(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class OrderListCreateAPIView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (ClaimsJWTAuthentication,)
+
+    pagination_class = OrderCursorPagination
 
     def get(self, request):
-        orders = Order.objects.all()
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        # ?role=seller - заказы моих товаров, по умолчанию - мои покупки
+        role = request.query_params.get('role', 'buyer')
+        if role not in ('buyer', 'seller'):
+            return Response({'role': ['Допустимые значения: buyer, seller.']}, status=status.HTTP_400_BAD_REQUEST)
+        orders = Order.objects.filter(**{f'{role}_id': request.user.pk}).select_related('product')
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(orders, request, view=self)
+        serializer = OrderHistorySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
+        # Распроданный горячий товар отклоняем до любых обращений к БД.
+        # Тело не объект (список, строка) - ответ 400 вернёт сериализатор
+        product_id = request.data.get('product') if isinstance(request.data, dict) else None
+        if str(product_id).isdigit() and gate.is_sold_out(int(product_id)):
+            return Response({'detail': 'Товар распродан', 'products': [int(product_id)]}, status=status.HTTP_409_CONFLICT)
         serializer = OrderSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            try:
+                order = create_order(
+                    request.user,
+                    serializer.validated_data['product'],
+                    serializer.validated_data.get('quantity', 1),
+                )
+            except InsufficientStock as e:
+                return Response({'detail': str(e), 'products': e.product_ids}, status=status.HTTP_409_CONFLICT)
+            return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class SellerStatsView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    authentication_classes = (ClaimsJWTAuthentication,)
+
+    def get(self, request):
+        # Читаем только дневные итоги, а не таблицу заказов
+        try:
+            date_to = date.fromisoformat(request.query_params.get('date_to', date.today().isoformat()))
+            date_from = date.fromisoformat(request.query_params.get('date_from', (date_to - timedelta(days=29)).isoformat()))
+        except ValueError:
+            return Response({'detail': 'Даты ожидаются в формате ГГГГ-ММ-ДД'}, status=status.HTTP_400_BAD_REQUEST)
+        rollups = SellerDailySales.objects.filter(seller_id=request.user.pk, day__range=(date_from, date_to))
+        totals = {'units': Sum('units'), 'revenue': Sum('revenue')}
+        days = rollups.values('day').annotate(**totals).order_by('day')
+        products = rollups.values('product').annotate(**totals).order_by('-revenue')
+        return Response({
+            'date_from': date_from,
+            'date_to': date_to,
+            'days': DailySalesSerializer(days, many=True).data,
+            'products': ProductSalesSerializer(products, many=True).data,
+        })
+
 class CategoryList(ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+
+    def list(self, request, *args, **kwargs):
+        return snapshots.get(snapshots.CATEGORIES, self.build_snapshot).response(request)
+
+    def build_snapshot(self):
+        version, changed_at = versions.current('category')
+        serializer = self.serializer_class(self.get_queryset(), many=True)
+        return snapshots.Snapshot(JSONRenderer().render(serializer.data), f'"categories-{version}"', changed_at)
     
     def create(self, request, *args, **kwargs):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)  # Запрещаем метод POST
@@ -169,29 +498,130 @@ class CategoryList(ListAPIView):
     
 class CartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [JWTAuthentication, SessionAuthentication, BasicAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication, SessionAuthentication, BasicAuthentication]
 
     def get(self, request):
-        # Получаем корзину текущего пользователя
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
+        # Корзина с товарами и суммами: запрос корзины и запрос позиций
+        cart = carts.load_lines(carts.get_cart(request.user.pk))
+        serializer = CartSerializer(cart, context={'request': request})
         return Response(serializer.data)
 
     def post(self, request):
-        # Добавляем новый элемент в корзину пользователя
-        cart, created = Cart.objects.get_or_create(user=request.user)
+        # Добавляем товар в корзину; если он уже там, увеличиваем количество
+        cart = carts.get_cart(request.user.pk)
         serializer = CartItemSerializer(data=request.data)
         if serializer.is_valid():
-            cart_item = serializer.save(cart=cart)
+            product = serializer.validated_data['product']
+            carts.apply_changes(cart, [{
+                'product': product.pk,
+                'op': 'increment',
+                'quantity': serializer.validated_data['quantity'],
+            }])
+            cart_item = CartItem.objects.get(cart=cart, product=product)
             return Response(CartItemSerializer(cart_item).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+class CartItemsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication, SessionAuthentication, BasicAuthentication]
+
+    def patch(self, request):
+        # Пакет изменений корзины (set, increment, remove) одним запросом,
+        # например синхронизация корзины, собранной офлайн
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart = carts.get_cart(request.user.pk)
+        try:
+            carts.apply_changes(cart, serializer.validated_data['items'])
+        except carts.UnknownProducts as e:
+            return Response({'detail': str(e), 'products': e.product_ids}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(CartSerializer(carts.load_lines(cart), context={'request': request}).data)
+
+
+class CartItemView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication, SessionAuthentication, BasicAuthentication]
+
     def delete(self, request, item_id):
         # Удаляем элемент из корзины пользователя
-        try:
-            cart_item = CartItem.objects.get(id=item_id, cart__user=request.user)
-            cart_item.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        except CartItem.DoesNotExist:
+        deleted, _ = CartItem.objects.filter(id=item_id, cart__user_id=request.user.pk).delete()
+        if not deleted:
             return Response(status=status.HTTP_404_NOT_FOUND)
-    
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CartCheckoutView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [ClaimsJWTAuthentication, SessionAuthentication, BasicAuthentication]
+
+    def post(self, request):
+        # Оформляем всю корзину одним запросом
+        try:
+            orders = checkout_cart(request.user)
+        except EmptyCart:
+            return Response({'detail': 'Корзина пуста'}, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as e:
+            return Response({'detail': str(e), 'products': e.product_ids}, status=status.HTTP_409_CONFLICT)
+        serializer = OrderSerializer(orders, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+MEDIA_CHUNK_SIZE = 64 * 1024
+
+
+def _read_range(file, length):
+    with file:
+        while length > 0:
+            chunk = file.read(min(MEDIA_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    # Медиафайлы с поддержкой Range и вечным кэшем для имён по хэшу содержимого
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    immutable = is_content_addressed(path)
+    if immutable:
+        etag = '"%s"' % os.path.splitext(os.path.basename(path))[0]
+    else:
+        etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        match = RANGE_RE.fullmatch(request.headers.get('Range', '').strip())
+        if match and any(match.groups()):
+            size = stat.st_size
+            if match[1]:
+                start, end = int(match[1]), min(int(match[2] or size - 1), size - 1)
+            else:
+                start, end = max(size - int(match[2]), 0), size - 1
+            if start > end:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+            file = open(full_path, 'rb')
+            file.seek(start)
+            response = StreamingHttpResponse(_read_range(file, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    if immutable:
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=3600'
+    return response